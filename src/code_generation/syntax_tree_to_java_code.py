@@ -1,14 +1,57 @@
+from typing import Iterable
+
 from src.code_generation.generator.CodeGeneratorFactory import CodeGeneratorFactory
 from src.code_generation.syntax.base_type import Language
+from src.code_generation.syntax.definition import ClassTestDefinition, FunctionTestDefinition
+from src.code_generation.syntax.expression import IdentifierExpression
 from src.code_generation.tree.adapter.ClassTreeAdapter import ClassTreeAdapter
 
 
-def syntax_tree_to_java_code(tree):
+def syntax_tree_to_java_code(tree, output_path="output.java"):
     adapter = ClassTreeAdapter()
 
     generator = CodeGeneratorFactory.get_generator(Language.java, adapter, tree)
     code = generator.generate()
     print("\nJava Code:")
     print(code)
-    with open("output.java", "w") as f:
-        f.write(code)
\ No newline at end of file
+    with open(output_path, "w") as f:
+        f.write(code)
+
+
+def stream_syntax_trees_to_java_code(
+        class_name: str,
+        methods: Iterable[FunctionTestDefinition],
+        output_path="output.java",
+) -> int:
+    """
+    Write the same code as ``syntax_tree_to_java_code`` for a test class made of ``methods``,
+    but method by method, so that the whole class never has to be held in memory.
+
+    Args:
+        class_name (str): The name of the test class.
+        methods (Iterable[FunctionTestDefinition]): The test methods, consumed lazily.
+        output_path (str): The file to write the code to.
+
+    Returns:
+        int: The number of methods written.
+    """
+    adapter = ClassTreeAdapter()
+    empty_class = ClassTestDefinition(name=IdentifierExpression(name=class_name), methods=[])
+    generator = CodeGeneratorFactory.get_generator(Language.java, adapter, empty_class)
+    class_code = generator.generate()
+    class_end = "\n}"
+    class_start = class_code.removesuffix(class_end)
+
+    print("\nJava Code:")
+    nb_methods = 0
+    with open(output_path, "w") as f:
+        f.write(class_start)
+        print(class_start, end="")
+        for method in methods:
+            code = "\n\n" + generator.visit(method, 1)
+            f.write(code)
+            print(code, end="")
+            nb_methods += 1
+        f.write(class_end)
+        print(class_end)
+    return nb_methods
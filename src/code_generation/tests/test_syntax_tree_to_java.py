@@ -26,6 +26,7 @@ from src.code_generation.syntax.statement import (
     IfStatement, CommentStatement,
 )
 from src.code_generation.syntax.syntax_tree import Parameter, Decorator, Body
+from src.code_generation.syntax_tree_to_java_code import syntax_tree_to_java_code, stream_syntax_trees_to_java_code
 from src.code_generation.tree.adapter.ClassTreeAdapter import ClassTreeAdapter
 
 
@@ -1438,3 +1439,25 @@ def test_mega_class_definition(adapter, language):
     }
 }"""
     assert code == expected_code
+
+
+
+@pytest.mark.parametrize("nb_methods", [0, 1, 3])
+def test_stream_syntax_trees_to_java_code__write_same_code_as_whole_tree(tmp_path, nb_methods):
+    # Arrange
+    methods = [
+        FunctionTestDefinition(
+            name=IdentifierExpression(name=f"test_{i}"),
+            body=Body(statements=[CommentStatement(comment="Arrange")]),
+        )
+        for i in range(nb_methods)
+    ]
+    tree = ClassTestDefinition(name=IdentifierExpression(name="class_test"), methods=methods)
+    syntax_tree_to_java_code(tree, tmp_path / "whole.java")
+
+    # Act
+    written = stream_syntax_trees_to_java_code("class_test", iter(methods), tmp_path / "streamed.java")
+
+    # Assert
+    assert written == nb_methods
+    assert (tmp_path / "streamed.java").read_text() == (tmp_path / "whole.java").read_text()
@@ -0,0 +1,83 @@
+import networkx as nx
+
+from src.graph.csr import CSRGraph
+
+
+def compress_chains(
+        graph: nx.DiGraph | CSRGraph,
+        start: str,
+        end: str | list[str],
+) -> tuple[CSRGraph, dict[str, list[str]]]:
+    """
+    Collapse the linear chains of the graph into single nodes.
+
+    An edge (u, v) is collapsed when u has no other successor and v no other predecessor, so a
+    chain of action boxes becomes one node named after its first node. The start node always
+    begins a chain and the end nodes are kept alone, so they keep their ids and paths and
+    cycles of the reduced graph stand for the same paths and cycles of the graph.
+
+    Args:
+        graph: The directed graph, a networkx graph is converted to a CSRGraph first
+        start: The starting node
+        end: The ending nodes
+
+    Returns:
+        The reduced graph and, for each of its nodes, the nodes of the chain it stands for
+    """
+    if not isinstance(end, list):
+        end = [end]
+    if not isinstance(graph, CSRGraph):
+        graph = CSRGraph.from_networkx(graph)
+    adjacency = graph.adjacency()
+    in_degree = graph.in_degree().tolist()
+    start = graph.index[start]
+    end = {graph.index[node] for node in end}
+
+    # next_node[u] is v when the edge (u, v) is collapsed
+    next_node = [-1] * len(adjacency)
+    for u, neighbors in enumerate(adjacency):
+        if len(neighbors) == 1 and u not in end:
+            v = neighbors[0]
+            if in_degree[v] == 1 and v != u and v != start and v not in end:
+                next_node[u] = v
+    is_next = bytearray(len(adjacency))
+    for v in next_node:
+        if v != -1:
+            is_next[v] = 1
+
+    # walk every chain from its first node, nodes left on a ring of collapsible edges stay alone
+    chains = []
+    chain_of = [-1] * len(adjacency)
+    for head in range(len(adjacency)):
+        if is_next[head]:
+            continue
+        chain = [head]
+        while next_node[chain[-1]] != -1:
+            chain.append(next_node[chain[-1]])
+        for node in chain:
+            chain_of[node] = len(chains)
+        chains.append(chain)
+    for node in range(len(adjacency)):
+        if chain_of[node] == -1:
+            chain_of[node] = len(chains)
+            chains.append([node])
+
+    # a chain keeps the successors of its last node, in the same order
+    edges = []
+    edge_labels = []
+    for chain_id, chain in enumerate(chains):
+        tail = chain[-1]
+        first_edge = graph.offsets[tail]
+        for k, neighbor in enumerate(adjacency[tail]):
+            edges.append((chain_id, chain_of[neighbor]))
+            edge_labels.append(graph.edge_labels[first_edge + k])
+
+    ids = [graph.ids[chain[0]] for chain in chains]
+    labels = [graph.labels[chain[0]] for chain in chains]
+    reduced = CSRGraph.from_edges(ids, edges, labels, edge_labels)
+    return reduced, {graph.ids[chain[0]]: [graph.ids[node] for node in chain] for chain in chains}
+
+
+def expand_path(path: list[str], chains: dict[str, list[str]]) -> list[str]:
+    """Replace every node of a path or cycle of the reduced graph by the nodes of its chain."""
+    return [node for chain_node in path for node in chains[chain_node]]
@@ -0,0 +1,132 @@
+from typing import Hashable, Iterable
+
+import networkx as nx
+import numpy as np
+from scipy.sparse import csr_array
+from scipy.sparse.csgraph import connected_components
+
+
+class CSRGraph:
+    """
+    Directed graph whose nodes are numbered ``0..n-1`` and whose edges are stored in
+    compressed sparse row form: the successors of node ``i`` are
+    ``targets[offsets[i]:offsets[i + 1]]``, in insertion order.
+
+    The draw.io ids are kept on the side in ``ids`` (``ids[i]`` is the id of node ``i``)
+    and ``index`` (the reverse mapping). Algorithms run on the dense integers and only
+    translate back to ids when returning.
+
+    Attributes:
+        ids: The id of every node.
+        index: Maps an id to its node number.
+        offsets: Start of the successors of every node in ``targets``, length n + 1.
+        targets: Successors of every node, length m.
+        labels: The label of every node, None when it has none.
+        edge_labels: The label of every edge, aligned with ``targets``.
+    """
+
+    def __init__(
+            self,
+            ids: list[Hashable],
+            offsets: np.ndarray,
+            targets: np.ndarray,
+            labels: list[str | None] | None = None,
+            edge_labels: list[str | None] | None = None,
+    ):
+        self.ids = ids
+        self.index = {id: i for i, id in enumerate(ids)}
+        self.offsets = offsets
+        self.targets = targets
+        self.labels = labels if labels is not None else [None] * len(ids)
+        self.edge_labels = edge_labels if edge_labels is not None else [None] * len(targets)
+        self._adjacency = None
+        self._components = None
+
+    @classmethod
+    def from_edges(
+            cls,
+            ids: list[Hashable],
+            edges: Iterable[tuple[int, int]],
+            labels: list[str | None] | None = None,
+            edge_labels: list[str | None] | None = None,
+    ) -> "CSRGraph":
+        """
+        Build the graph from ``(source, target)`` node numbers. Successors keep the order in
+        which their edges are given, ``edge_labels`` is aligned with ``edges``.
+        """
+        edges = list(edges)
+        n = len(ids)
+        sources = np.fromiter((u for u, _ in edges), dtype=np.int64, count=len(edges))
+        targets = np.fromiter((v for _, v in edges), dtype=np.int32, count=len(edges))
+
+        order = np.argsort(sources, kind="stable")  # group by source, keep insertion order
+        offsets = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(sources, minlength=n), out=offsets[1:])
+        if edge_labels is not None:
+            edge_labels = [edge_labels[i] for i in order.tolist()]
+        return cls(ids, offsets, targets[order], labels, edge_labels)
+
+    @classmethod
+    def from_networkx(cls, G: nx.DiGraph) -> "CSRGraph":
+        ids = list(G.nodes)
+        index = {id: i for i, id in enumerate(ids)}
+        labels = [data.get("label") for _, data in G.nodes(data=True)]
+
+        edges = []
+        edge_labels = []
+        for u, neighbors in G.adjacency():
+            for v, data in neighbors.items():
+                edges.append((index[u], index[v]))
+                edge_labels.append(data.get("label"))
+        return cls.from_edges(ids, edges, labels, edge_labels)
+
+    def to_networkx(self) -> nx.DiGraph:
+        G = nx.DiGraph()
+        for id, label in zip(self.ids, self.labels):
+            G.add_node(id, label=label)
+        for u, v, label in self.edges():
+            G.add_edge(self.ids[u], self.ids[v], label=label)
+        return G
+
+    def number_of_nodes(self) -> int:
+        return len(self.ids)
+
+    def number_of_edges(self) -> int:
+        return len(self.targets)
+
+    def successors(self, node: int) -> np.ndarray:
+        return self.targets[self.offsets[node]:self.offsets[node + 1]]
+
+    def edges(self) -> Iterable[tuple[int, int, str | None]]:
+        sources = np.repeat(np.arange(self.number_of_nodes()), np.diff(self.offsets))
+        return zip(sources.tolist(), self.targets.tolist(), self.edge_labels)
+
+    def out_degree(self) -> np.ndarray:
+        return np.diff(self.offsets)
+
+    def in_degree(self) -> np.ndarray:
+        return np.bincount(self.targets, minlength=self.number_of_nodes())
+
+    def adjacency(self) -> list[list[int]]:
+        """Successors of every node as plain lists, faster than the arrays in pure Python loops."""
+        if self._adjacency is None:
+            targets = self.targets.tolist()
+            offsets = self.offsets.tolist()
+            self._adjacency = [targets[offsets[i]:offsets[i + 1]] for i in range(len(self.ids))]
+        return self._adjacency
+
+    def strongly_connected_components(self) -> tuple[int, list[int]]:
+        """
+        The strongly connected components, found once with scipy.
+
+        Returns:
+            The number of components and the component of every node, numbered from 0
+        """
+        if self._components is None:
+            nb_nodes = self.number_of_nodes()
+            matrix = csr_array(
+                (np.ones(self.number_of_edges()), self.targets, self.offsets), shape=(nb_nodes, nb_nodes)
+            )
+            nb_components, labels = connected_components(matrix, directed=True, connection="strong")
+            self._components = nb_components, labels.tolist()
+        return self._components
@@ -0,0 +1,47 @@
+from typing import Hashable, Iterable
+
+
+class CycleIndex:
+    """
+    Inverted index of the cycles of a graph, built once from the output of ``find_cycles``.
+
+    A cycle is known by its id, its position in ``cycles``. The index answers which cycles
+    go through a node or an edge, and so which cycles a step of a path advances, without
+    going over every cycle.
+
+    Attributes:
+        cycles: The cycles, each a list of nodes.
+        lengths: The number of nodes of every cycle.
+        node_cycles: Maps a node to the ids of the cycles going through it, in increasing order.
+        edge_cycles: Maps an edge ``(u, v)`` to the ids of the cycles going through it, in
+            increasing order.
+        successors: For every cycle, maps each of its nodes to the next one in the cycle.
+        positions: For every cycle, maps each of its nodes to its position in the cycle.
+    """
+
+    def __init__(self, cycles: Iterable[list[Hashable]]):
+        self.cycles = [list(cycle) for cycle in cycles]
+        self.lengths = [len(cycle) for cycle in self.cycles]
+        self.node_cycles = {}
+        self.edge_cycles = {}
+        self.successors = []
+        self.positions = []
+        for cycle_id, cycle in enumerate(self.cycles):
+            successors = {}
+            for i, node in enumerate(cycle):
+                successor = cycle[(i + 1) % len(cycle)]
+                successors[node] = successor
+                self.node_cycles.setdefault(node, []).append(cycle_id)
+                self.edge_cycles.setdefault((node, successor), []).append(cycle_id)
+            self.successors.append(successors)
+            self.positions.append({node: i for i, node in enumerate(cycle)})
+
+    def __len__(self) -> int:
+        return len(self.cycles)
+
+    def cycles_through_node(self, node: Hashable) -> list[int]:
+        return self.node_cycles.get(node, [])
+
+    def cycles_through_edge(self, u: Hashable, v: Hashable) -> list[int]:
+        """The cycles a path advances when it goes from u to v."""
+        return self.edge_cycles.get((u, v), [])
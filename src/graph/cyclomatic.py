@@ -1,9 +1,14 @@
 import networkx as nx
 
+from src.graph.csr import CSRGraph
 
-def compute_cyclomatic_number(graph):
+
+def compute_cyclomatic_number(graph: nx.DiGraph | CSRGraph):
     nb_edges = graph.number_of_edges()
     nb_nodes = graph.number_of_nodes()
-    nb_connected_components = len(list(nx.strongly_connected_components(graph)))
+    if isinstance(graph, CSRGraph):
+        nb_connected_components, _ = graph.strongly_connected_components()
+    else:
+        nb_connected_components = len(list(nx.strongly_connected_components(graph)))
 
     return nb_edges - nb_nodes + 2*nb_connected_components
@@ -0,0 +1,584 @@
+import logging
+import time
+from dataclasses import dataclass
+from typing import Iterable, Iterator
+
+import networkx as nx
+import numpy as np
+from scipy.sparse import csr_array
+from scipy.sparse.csgraph import maximum_flow
+
+from src.graph.csr import CSRGraph
+from src.graph.cycle_index import CycleIndex
+from src.graph.find_minimal_paths import EDGE, EDGE_PAIR, SUBPATH_NODES
+from src.graph.find_path_with_cycles import (
+    MAX_EXPANDED, MAX_PATHS, MAX_PATH_LENGTH, TIMEOUT, PathSearchBudget, PathSearchStats, PathStates,
+    materialize, path_chain,
+)
+from src.graph.loop_nesting_forest import LoopNestingForest
+from src.graph.set_cover import lazy_greedy_cover
+
+logger = logging.getLogger(__name__)
+
+
+# coverage criterion asking every cycle, or every loop of a LoopNestingForest, to be gone around
+# by a path, or for one path when there is none, see NODE, EDGE and EDGE_PAIR for the others
+LOOP = "loop"
+
+
+@dataclass
+class CoverageStats:
+    """Test requirements of a coverage criterion, filled by the functions covering them."""
+    requirements: int = 0  # requirements generated
+    covered: int = 0  # requirements covered by the paths found
+
+
+def _reachable_bits(nb_nodes: int, edges: list[tuple[int, int]], own: list[int]) -> list[int]:
+    """For every node, the union of the ``own`` bits of the nodes it can reach through edges, itself included."""
+    nb_components, component = CSRGraph.from_edges(list(range(nb_nodes)), edges).strongly_connected_components()
+    successors = [set() for _ in range(nb_components)]
+    for u, v in edges:
+        if component[u] != component[v]:
+            successors[component[u]].add(component[v])
+    bits = [0] * nb_components
+    for node, node_bits in enumerate(own):
+        bits[component[node]] |= node_bits
+
+    # depth first on the condensation, a component takes the bits of its successors once they are done
+    done = [False] * nb_components
+    for root in range(nb_components):
+        if done[root]:
+            continue
+        done[root] = True
+        stack = [(root, iter(successors[root]))]
+        while stack:
+            current, current_successors = stack[-1]
+            for successor in current_successors:
+                if not done[successor]:
+                    done[successor] = True
+                    stack.append((successor, iter(successors[successor])))
+                    break
+            else:
+                stack.pop()
+                for successor in successors[current]:
+                    bits[current] |= bits[successor]
+    return [bits[component[node]] for node in range(nb_nodes)]
+
+
+def iter_covering_paths(
+        graph: nx.DiGraph | CSRGraph,
+        start: str,
+        end: str | list[str],
+        cycles: Iterable[list] | CycleIndex | LoopNestingForest,
+        criterion: str = EDGE,
+        coverage: CoverageStats | None = None,
+        stats: PathSearchStats | None = None,
+        budget: PathSearchBudget | None = None,
+) -> Iterator[list[str]]:
+    """
+    Yield paths of ``find_paths_with_cycles`` covering the requirements of a criterion, stopping
+    as soon as every requirement is covered.
+
+    The requirements are the nodes, edges (and nodes) or pairs of successive edges (and edges
+    and nodes) on a path from start to an end, or for LOOP the cycles, or loops of a
+    LoopNestingForest, on such a path. With no loop, LOOP asks for one path so that every
+    graph gets a test. The requirements are read from the graph, which over-estimates them:
+    a pair of edges going around a cycle twice is on a path of the graph but on no path
+    allowed by the cycles. Once the search proves no path covers the uncovered ones, they
+    are taken out of ``coverage.requirements``.
+
+    Every path is searched from start, depth first, trying first the successor with the most
+    uncovered requirements covered or reachable from its node in the graph, an upper bound of
+    what the path can add. Partial paths that can add nothing are dropped and the first
+    complete path adding coverage is yielded. The bound ignores the cycles, so a partial path
+    may stall, with no allowed continuation adding coverage. Its (node, cycle usage) state
+    (see PathStates) is then remembered and no later search goes through it again, the
+    uncovered requirements only shrink. The search goes through the states of the partial
+    paths that stall, not through every path nor every state.
+
+    Args:
+        graph: The directed graph, a networkx graph is converted to a CSRGraph first
+        start: The starting node
+        end: The ending node
+        cycles: The cycles, where each cycle is a list of nodes, or their CycleIndex. A
+            LoopNestingForest instead lets each path go around each of its loops at most once
+        criterion: NODE, EDGE, EDGE_PAIR or LOOP
+        coverage: If given, receives the number of requirements and of covered requirements
+        stats: If given, receives the search counters
+        budget: If given, the limits of the search
+
+    Yields:
+        Paths, where each path is a list of nodes
+    """
+    if criterion not in (*SUBPATH_NODES, LOOP):
+        raise ValueError(f"Unknown coverage criterion '{criterion}', expected one of {[*SUBPATH_NODES, LOOP]}")
+    if coverage is None:
+        coverage = CoverageStats()
+    if stats is None:
+        stats = PathSearchStats()
+    if budget is None:
+        budget = PathSearchBudget()
+    states = PathStates(graph, start, end, cycles)
+    ids = states.graph.ids
+    for path in _covering_paths(states, criterion, coverage, stats, budget):
+        path = [ids[node] for node in path]
+        logger.info(f"Found covering path: {path}")
+        yield path
+
+
+def _covering_paths(
+        states: PathStates,
+        criterion: str,
+        coverage: CoverageStats,
+        stats: PathSearchStats,
+        budget: PathSearchBudget,
+) -> Iterator[list[int]]:
+    """The paths of ``iter_covering_paths``, as lists of node numbers."""
+    adjacency = states.graph.adjacency()
+    start, end = states.start, states.end
+
+    # the nodes and edges of the paths of the graph from start to an end node, a path stops
+    # at the first end node it reaches
+    live = bytearray(len(adjacency))
+    live[start] = 1
+    stack = [start]
+    while stack:
+        node = stack.pop()
+        if node in end:
+            continue
+        for neighbor in adjacency[node]:
+            if states.reaching[neighbor] and not live[neighbor]:
+                live[neighbor] = 1
+                stack.append(neighbor)
+    live_edges = [
+        (node, neighbor)
+        for node in range(len(adjacency)) if live[node] and node not in end
+        for neighbor in adjacency[node] if live[neighbor]
+    ]
+
+    # every requirement gets a bit, own[node] holds the bits of the requirements starting at node
+    own = [0] * len(adjacency)
+    if criterion == LOOP:
+        # the bit of a loop is the one of PathStates.used_loops
+        for bit, loop in enumerate(states.loops):
+            if live[loop[0]]:
+                own[loop[0]] |= 1 << bit
+        # with no loop, a requirement every complete path covers, so that one path is found
+        one_path = 0 if any(own) else 1 << len(states.loops)
+        for node in end:
+            own[node] |= one_path
+    else:
+        size = SUBPATH_NODES[criterion]
+        # the subpaths of 1 to size nodes of the paths, start first
+        windows = [(start,)] + [(node,) for node in range(len(adjacency)) if live[node] and node != start]
+        if size > 1:
+            windows += live_edges
+        pair_bits = {}  # the bits of the pairs of edges starting with each edge
+        if size > 2:
+            live_successors = [[] for _ in adjacency]
+            for u, v in live_edges:
+                live_successors[u].append(v)
+            for u, v in live_edges:
+                pair_bits[u, v] = 0
+                for w in live_successors[v]:
+                    pair_bits[u, v] |= 1 << len(windows)
+                    windows.append((u, v, w))
+        bit_of = {window: bit for bit, window in enumerate(windows)}
+        for window, bit in bit_of.items():
+            own[window[0]] |= 1 << bit
+
+    reach = _reachable_bits(len(adjacency), live_edges, own)
+    uncovered = reach[start]
+    coverage.requirements = uncovered.bit_count()
+    coverage.covered = 0
+
+    def new_bits(chain: tuple | None, neighbor: int, state: tuple | None) -> int:
+        """The bits of the requirements a path covers when it goes on to neighbor in state, None if it ends there."""
+        if criterion == LOOP:
+            return states.used_loops(state) if state is not None else one_path
+        bits = 0
+        window = (neighbor,)
+        for _ in range(size):
+            if window in bit_of:
+                bits |= 1 << bit_of[window]
+            if chain is None:
+                break
+            window = (chain[0], *window)
+            chain = chain[1]
+        return bits
+
+    def bound(node: int, chain: tuple, bits: int) -> int:
+        """The number of uncovered requirements a partial path ending at node can still cover, at most."""
+        bits |= reach[node]
+        if criterion == EDGE_PAIR and chain[1] is not None:
+            # the pairs of edges starting at the node before the last one
+            bits |= pair_bits.get((chain[1][0], node), 0)
+        return (bits & uncovered).bit_count()
+
+    def successors_to_try(node: int, chain: tuple, state: tuple, bits: int) -> list[tuple]:
+        """The continuations of a partial path that may add coverage, the best one last."""
+        successors = []
+        for neighbor, new_state in states.successors(node, state):
+            new_chain = (neighbor, chain, chain[2] + 1)
+            new_covered = bits | new_bits(chain, neighbor, new_state)
+            if new_state is None:
+                new_bound = (new_covered & uncovered).bit_count()
+            else:
+                new_bound = bound(neighbor, new_chain, new_covered)
+            if new_bound:
+                # among equal bounds, prefer the edge covering new requirements itself
+                gain = (new_covered & ~bits & uncovered).bit_count()
+                successors.append((new_bound, gain, -len(successors), (neighbor, new_chain, new_state, new_covered)))
+        # the first one among equals last
+        successors.sort(key=lambda successor: successor[:3])
+        return [successor[3] for successor in successors]
+
+    # the states of the partial paths no continuation of which covers an uncovered
+    # requirement, when the path itself covers none, and of those no continuation of which
+    # ends at all; for EDGE_PAIR the first pair a continuation covers also depends on the
+    # node before, which is part of the key
+    barren = set()
+    dead = set()
+
+    def memo_key(node: int, chain: tuple, state: tuple) -> tuple:
+        key = states.key(node, state)
+        if criterion == EDGE_PAIR:
+            return chain[1][0] if chain[1] is not None else None, key
+        return key
+
+    max_path_length = budget.max_path_length
+    deadline = time.monotonic() + budget.timeout if budget.timeout is not None else None
+    nb_paths = 0
+    exhausted = False  # whether the last search proved no path adds coverage
+
+    def stop(reason: str) -> None:
+        stats.truncated = reason
+        logger.warning(f"Covering path search stopped after {nb_paths} paths: {reason} reached")
+
+    def next_path() -> tuple | None:
+        """
+        Depth first search of a path adding coverage, trying the successors with the highest
+        bound first, and remembering the states of the partial paths that stall.
+
+        Returns:
+            The chain and covered bits of the first such path, None if there is none or the
+            budget is spent
+        """
+        nonlocal exhausted
+        chain = path_chain([start])
+        if start in end:
+            bits = new_bits(None, start, None)
+            return (chain, bits) if bits & uncovered else None
+
+        # every frame is [memo key, covered bits, successors left to try, whether a
+        # continuation was cut by max_path_length or by going back to a state of the path]
+        frames = []
+        on_path = set()
+        cut = False
+        entry = (start, chain, states.initial_state, new_bits(None, start, states.initial_state))
+        while True:
+            if entry is not None:
+                node, chain, state, bits = entry
+                entry = None
+                if state is None:
+                    return chain, bits
+                key = memo_key(node, chain, state)
+                if key in dead or (key in barren and not bits & uncovered):
+                    continue
+                if key in on_path or (max_path_length is not None and chain[2] >= max_path_length):
+                    if key not in on_path:
+                        stats.truncated = stats.truncated or MAX_PATH_LENGTH
+                    if frames:
+                        frames[-1][3] = True
+                    else:
+                        cut = True
+                    continue
+                if stats.expanded == budget.max_expanded or (deadline is not None and time.monotonic() >= deadline):
+                    stop(MAX_EXPANDED if stats.expanded == budget.max_expanded else TIMEOUT)
+                    return None
+                stats.expanded += 1
+                on_path.add(key)
+                frames.append([key, bits, successors_to_try(node, chain, state, bits), False])
+
+            if not frames:
+                exhausted = not cut
+                return None
+            frame = frames[-1]
+            if frame[2]:
+                entry = frame[2].pop()
+                continue
+            # every continuation was tried
+            frames.pop()
+            on_path.discard(frame[0])
+            if frame[3]:
+                if frames:
+                    frames[-1][3] = True
+                else:
+                    cut = True
+                continue
+            barren.add(frame[0])
+            if frame[1] & uncovered:
+                dead.add(frame[0])
+
+    # one search per path, from start, so each path goes for the requirements still uncovered
+    while uncovered:
+        found = next_path()
+        if found is None:
+            if exhausted:
+                # no path allowed by the cycles covers the requirements left
+                logger.info(f"{uncovered.bit_count()} requirements are on no path allowed by the cycles")
+                coverage.requirements -= uncovered.bit_count()
+            return
+        chain, bits = found
+        coverage.covered += (bits & uncovered).bit_count()
+        uncovered &= ~bits
+        nb_paths += 1
+        yield materialize(chain)
+        if nb_paths == budget.max_paths and uncovered:
+            stop(MAX_PATHS)
+            return
+
+
+def find_covering_paths(
+        graph: nx.DiGraph | CSRGraph,
+        start: str,
+        end: str | list[str],
+        cycles: Iterable[list] | CycleIndex | LoopNestingForest,
+        criterion: str = EDGE,
+        coverage: CoverageStats | None = None,
+        stats: PathSearchStats | None = None,
+        budget: PathSearchBudget | None = None,
+) -> list[list[str]]:
+    """
+    Find paths of ``find_paths_with_cycles`` covering the requirements of a criterion.
+
+    See ``iter_covering_paths`` for the arguments.
+    """
+    return list(iter_covering_paths(graph, start, end, cycles, criterion, coverage, stats, budget))
+
+
+def _path_state_graph(states: PathStates, paths: list[list[int]]) -> tuple[list[tuple], dict[tuple, list[tuple[int, tuple | None]]]]:
+    """
+    The part of the state graph (see PathStates) the paths go through.
+
+    Returns:
+        The keys of the states, every state after the states it leads to, and the transitions
+        of every state as ``(neighbor, key)`` pairs, key being None when the path ends at neighbor
+    """
+    transitions = {}
+    for path in paths:
+        node, state = states.start, states.initial_state
+        for neighbor in path[1:]:
+            new_state = next(new_state for successor, new_state in states.successors(node, state) if successor == neighbor)
+            key_transitions = transitions.setdefault(states.key(node, state), [])
+            transition = (neighbor, states.key(neighbor, new_state) if new_state is not None else None)
+            if transition not in key_transitions:
+                key_transitions.append(transition)
+            node, state = neighbor, new_state
+
+    # depth first post-order from start
+    start_key = states.key(states.start, states.initial_state)
+    order = []
+    done = {start_key}
+    stack = [(start_key, iter(transitions[start_key]))]
+    while stack:
+        key, successors = stack[-1]
+        for _, successor in successors:
+            if successor is not None and successor not in done:
+                done.add(successor)
+                stack.append((successor, iter(transitions[successor])))
+                break
+        else:
+            stack.pop()
+            order.append(key)
+    return order, transitions
+
+
+def cover_paths_with_cycles(
+        graph: nx.DiGraph | CSRGraph,
+        start: str,
+        end: str | list[str],
+        cycles: Iterable[list] | CycleIndex | LoopNestingForest,
+) -> list[list[str]]:
+    """
+    Find few paths of ``find_paths_with_cycles`` covering every edge its paths go through,
+    without enumerating the paths.
+
+    The covering paths of EDGE and EDGE_PAIR (see iter_covering_paths) give the flow network:
+    the states they go through (see PathStates), where a graph edge has one occurrence per
+    state it leaves, so its start to end paths are paths of ``find_paths_with_cycles`` and mix
+    the covering paths. A first cover is picked greedily: each path is the one going through
+    the most uncovered edges, found by dynamic programming over the network, and the paths are
+    then pruned by lazy greedy set cover. Given one required occurrence of every edge, the
+    fewest paths going through all of them are a minimum flow with a lower bound of 1 on them:
+    a feasible flow routes each required occurrence along a tree from start and a tree to the
+    ends, then a maximum flow from the ends back to start, with scipy, cancels as much of it as
+    the lower bounds allow. The occurrences on the paths of the cover are required, so the flow
+    needs at most as many paths, and its pruned paths replace the cover as long as they are fewer.
+
+    The time is polynomial in the length of the covering paths, not in the number of paths or
+    of states. The cover is not always the smallest one, on small random graphs it is within a
+    few percent of ``minimum_path_cover_ilp`` on the enumerated paths.
+
+    Args:
+        graph: The directed graph, a networkx graph is converted to a CSRGraph first
+        start: The starting node
+        end: The ending node
+        cycles: The cycles, where each cycle is a list of nodes, read once so it may be a generator
+            such as iter_cycles(graph), or their CycleIndex. A LoopNestingForest instead lets
+            each path go around each of its loops at most once
+
+    Returns:
+        Paths, where each path is a list of nodes
+    """
+    states = PathStates(graph, start, end, cycles)
+    ids = states.graph.ids
+    start, end = states.start, states.end
+    if start in end:
+        return [[ids[start]]]
+    paths = []
+    for criterion in (EDGE, EDGE_PAIR):
+        paths += _covering_paths(states, criterion, CoverageStats(), PathSearchStats(), PathSearchBudget())
+    if not paths:
+        return []
+    order, transitions = _path_state_graph(states, paths)
+
+    # the states, numbered in topological order so start is 0, then one vertex per end node and the sink
+    number = {key: i for i, key in enumerate(reversed(order))}
+    end_number = {node: len(number) + i for i, node in enumerate(sorted(end))}
+    sink = len(number) + len(end_number)
+
+    # the edges of the flow network, each with the graph node it goes to and the number of
+    # the graph edge it goes through
+    tails = []
+    heads = []
+    nodes = []
+    edge_ids = []
+    graph_edges = {}
+    for key, tail in number.items():
+        for neighbor, successor in transitions[key]:
+            head = end_number[neighbor] if successor is None else number[successor]
+            tails.append(tail)
+            heads.append(head)
+            nodes.append(neighbor)
+            edge_ids.append(graph_edges.setdefault((key[0], neighbor), len(graph_edges)))
+    for head in end_number.values():
+        tails.append(head)
+        heads.append(sink)
+        nodes.append(None)
+        edge_ids.append(None)
+    first_in = [-1] * (sink + 1)
+    first_out = [-1] * (sink + 1)
+    for edge, (tail, head) in enumerate(zip(tails, heads)):
+        if first_in[head] == -1:
+            first_in[head] = edge
+        if first_out[tail] == -1:
+            first_out[tail] = edge
+    out_edges = [[] for _ in range(sink + 1)]
+    for edge, tail in enumerate(tails):
+        out_edges[tail].append(edge)
+
+    def min_flow(required: list[int]) -> list[list[int]]:
+        """The fewest paths of the flow network through the required edges, as lists of edges."""
+        # feasible flow: one unit through every required edge, from start along the first edge
+        # reaching each vertex and to the sink along the first edge leaving it
+        flow = [0] * len(tails)
+        lower = [0] * len(tails)
+        to_start = [0] * (sink + 1)
+        to_sink = [0] * (sink + 1)
+        for edge in required:
+            flow[edge] = lower[edge] = 1
+            to_start[tails[edge]] += 1
+            to_sink[heads[edge]] += 1
+        for vertex in reversed(range(1, sink + 1)):
+            if to_start[vertex]:
+                edge = first_in[vertex]
+                flow[edge] += to_start[vertex]
+                to_start[tails[edge]] += to_start[vertex]
+        for vertex in range(sink):
+            if to_sink[vertex]:
+                edge = first_out[vertex]
+                flow[edge] += to_sink[vertex]
+                to_sink[heads[edge]] += to_sink[vertex]
+
+        # cancel flow with a maximum flow from the sink to start, an edge can lose its flow
+        # above its lower bound and gain any amount
+        capacities = {}
+        for edge, (tail, head) in enumerate(zip(tails, heads)):
+            capacities[head, tail] = capacities.get((head, tail), 0) + flow[edge] - lower[edge]
+            capacities[tail, head] = capacities.get((tail, head), 0) + len(required)
+        rows, columns = zip(*capacities)
+        matrix = csr_array(
+            (np.array(list(capacities.values()), dtype=np.int32), (np.array(rows), np.array(columns))),
+            shape=(sink + 1, sink + 1),
+        )
+        cancelled = maximum_flow(matrix, sink, 0).flow.tocoo()
+        net = dict(zip(zip(cancelled.row.tolist(), cancelled.col.tolist()), cancelled.data.tolist()))
+        for edge, (tail, head) in enumerate(zip(tails, heads)):
+            flow[edge] -= net.get((head, tail), 0)
+
+        # split the flow into paths
+        paths = []
+        for _ in range(sum(flow[edge] for edge in out_edges[0])):
+            vertex = 0
+            path = []
+            while vertex != sink:
+                edge = next(edge for edge in out_edges[vertex] if flow[edge])
+                flow[edge] -= 1
+                vertex = heads[edge]
+                path.append(edge)
+            paths.append(path)
+        return paths
+
+    def greedy_paths() -> list[list[int]]:
+        """
+        Paths picked one at a time, each going through the most graph edges no previous path
+        goes through, an edge counting once per time the path goes through it.
+        """
+        paths = []
+        uncovered = (1 << len(graph_edges)) - 1
+        while uncovered:
+            # the best edge leaving every vertex, and the gain of the path it starts, vertices
+            # after the ones they lead to
+            gains = [0] * (sink + 1)
+            best = [-1] * (sink + 1)
+            for vertex in reversed(range(len(number))):
+                for edge in out_edges[vertex]:
+                    gain = (uncovered >> edge_ids[edge] & 1) + gains[heads[edge]]
+                    if best[vertex] == -1 or gain > gains[vertex]:
+                        gains[vertex] = gain
+                        best[vertex] = edge
+            path = [best[0]]
+            while heads[path[-1]] < len(number):
+                path.append(best[heads[path[-1]]])
+            for edge in path:
+                uncovered &= ~(1 << edge_ids[edge])
+            paths.append(path)
+        return paths
+
+    def greedy_cover(paths: list[list[int]]) -> list[list[int]]:
+        """The paths picked by lazy greedy set cover on the graph edges they go through."""
+        bitsets = []
+        for path in paths:
+            bitset = 0
+            for edge in path:
+                if edge_ids[edge] is not None:
+                    bitset |= 1 << edge_ids[edge]
+            bitsets.append(bitset)
+        return [paths[i] for i in lazy_greedy_cover(bitsets)]
+
+    # the occurrences of the graph edges on the paths of a cover are required, so the minimum
+    # flow through them needs at most as many paths, and its paths give the next occurrences
+    cover = greedy_cover(greedy_paths())
+    while True:
+        required = {}
+        for path in cover:
+            for edge in path:
+                if edge_ids[edge] is not None:
+                    required.setdefault(edge_ids[edge], edge)
+        paths = greedy_cover(min_flow(list(required.values())))
+        if len(paths) >= len(cover):
+            break
+        cover = paths
+
+    return [[ids[start]] + [ids[nodes[edge]] for edge in path if nodes[edge] is not None] for path in cover]
@@ -1,10 +1,264 @@
+import logging
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from itertools import islice
+from typing import Iterator
+
 import networkx as nx
 
-def find_cycles(graph: nx.Graph) -> list:
-    cycles = list(nx.simple_cycles(graph))
+from src.graph.csr import CSRGraph
+
+logger = logging.getLogger(__name__)
+
+
+# reasons for a cycle search to stop before finding every cycle, see CycleSearchStats.truncated
+MAX_CYCLE_LENGTH = "max_cycle_length"
+MAX_CYCLES = "max_cycles"
+
+
+@dataclass
+class CycleSearchStats:
+    """Status filled by ``find_cycles`` and ``iter_cycles`` when given one."""
+    truncated: str | None = None  # the limit that was hit (MAX_CYCLES, ...), None if every cycle was found
+
+
+@dataclass
+class SCCTiming:
+    """Cycle search of one strongly connected component."""
+    nodes: int  # number of nodes of the component
+    cycles: int  # number of cycles found in it
+    seconds: float
+
+
+def _strongly_connected_components(graph: CSRGraph) -> list[list[int]]:
+    """
+    The strongly connected components that hold at least one cycle: more than one node or a
+    self-loop. They are listed by their first node, their nodes in graph order.
+    """
+    nb_components, labels = graph.strongly_connected_components()
+    sizes = [0] * nb_components
+    for label in labels:
+        sizes[label] += 1
+
+    components = {}
+    adjacency = graph.adjacency()
+    for node, label in enumerate(labels):
+        if sizes[label] > 1 or node in adjacency[node]:
+            components.setdefault(label, []).append(node)
+    return list(components.values())
+
+
+def _component_cycles(
+        nodes: list[int],
+        edges: list[tuple[int, int]],
+        max_length: int | None = None,
+        max_cycles: int | None = None,
+        backend: str = "johnson",
+) -> tuple[list[list[int]], bool, float]:
+    """
+    Find the cycles of one component, with _johnson_cycles or, for the "networkx" backend or
+    a length bound, nx.simple_cycles.
+
+    Returns:
+        At most max_cycles cycles of at most max_length nodes, whether more cycles were
+        found than max_cycles and the time taken
+    """
+    start = time.perf_counter()
+    limit = max_cycles + 1 if max_cycles is not None else None
+    if backend == "johnson" and max_length is None:
+        cycles = _johnson_cycles(nodes, edges, limit)
+    else:
+        component = nx.DiGraph()
+        component.add_nodes_from(nodes)
+        component.add_edges_from(edges)
+        cycles = list(islice(nx.simple_cycles(component, length_bound=max_length), limit))
+    too_many = max_cycles is not None and len(cycles) > max_cycles
+    return cycles[:max_cycles], too_many, time.perf_counter() - start
+
+
+def _johnson_cycles(nodes: list[int], edges: list[tuple[int, int]], max_cycles: int | None = None) -> list[list[int]]:
+    """
+    Johnson's algorithm on the node numbers of one component, see
+    ``src/graph/testing/all_cycles_directed_graph_raw.py`` for the set based version.
+
+    The cycles through ``start`` are searched among the nodes ``>= start`` that can reach it,
+    so neither the smaller nodes nor the subgraph have to be removed or rebuilt.
+    ``blocked`` and the allowed nodes are bytearray bitsets.
+    """
+    # renumber the component 0..size-1 so the bitsets are as small as the component
+    size = len(nodes)
+    local = {node: i for i, node in enumerate(nodes)}
+    successors = [[] for _ in range(size)]
+    predecessors = [[] for _ in range(size)]
+    for u, v in edges:
+        successors[local[u]].append(local[v])
+        predecessors[local[v]].append(local[u])
+
+    cycles = []
+    for start in range(size):
+        # the nodes >= start from which start can be reached, the only ones on its cycles
+        allowed = bytearray(size)
+        allowed[start] = 1
+        to_visit = [start]
+        while to_visit:
+            for u in predecessors[to_visit.pop()]:
+                if u > start and not allowed[u]:
+                    allowed[u] = 1
+                    to_visit.append(u)
+        reached = [u for u in range(start, size) if allowed[u]]
+        neighbors = {u: [v for v in successors[u] if allowed[v]] for u in reached}
+
+        blocked = bytearray(size)
+        B = {u: set() for u in reached}  # B[v] holds the nodes to unblock when v is unblocked
+        blocked[start] = 1
+        path = [start]
+        closed = [False]  # whether a cycle was found through each node of the path
+        stack = [iter(neighbors[start])]
+        while stack:
+            for neighbor in stack[-1]:
+                if neighbor == start:
+                    cycles.append([nodes[u] for u in path])
+                    if len(cycles) == max_cycles:
+                        return cycles
+                    closed[-1] = True
+                elif not blocked[neighbor]:
+                    path.append(neighbor)
+                    closed.append(False)
+                    stack.append(iter(neighbors[neighbor]))
+                    blocked[neighbor] = 1
+                    break
+            else:
+                stack.pop()
+                node = path.pop()
+                if closed.pop():
+                    if closed:
+                        closed[-1] = True
+                    # unblock node and, recursively, the nodes waiting on it
+                    to_unblock = [node]
+                    while to_unblock:
+                        u = to_unblock.pop()
+                        if blocked[u]:
+                            blocked[u] = 0
+                            to_unblock.extend(B[u])
+                            B[u].clear()
+                else:
+                    for v in neighbors[node]:
+                        B[v].add(node)
     return cycles
 
 
+def _component_edges(graph: CSRGraph, components: list[list[int]]) -> list[list[tuple[int, int]]]:
+    """The edges inside every component."""
+    component_of = {node: i for i, component in enumerate(components) for node in component}
+    adjacency = graph.adjacency()
+    edges = [[] for _ in components]
+    for i, component in enumerate(components):
+        for u in component:
+            edges[i].extend((u, v) for v in adjacency[u] if component_of.get(v) == i)
+    return edges
+
+
+def iter_cycles(
+        graph: nx.DiGraph | CSRGraph,
+        max_workers: int | None = 1,
+        scc_timings: list[SCCTiming] | None = None,
+        ordered: bool = False,
+        max_length: int | None = None,
+        max_cycles: int | None = None,
+        stats: CycleSearchStats | None = None,
+        backend: str = "johnson",
+) -> Iterator[list]:
+    """
+    Yield the elementary cycles of the graph, one strongly connected component at a time.
+
+    Every cycle lies inside one strongly connected component, so the components are searched
+    on their own and the ones without a cycle are skipped. With a pool, the cycles of a
+    component are yielded as soon as it is done unless ``ordered`` is set.
+
+    With limits, the search skips the cycles longer than ``max_length`` and stops after
+    ``max_cycles`` cycles, ``stats.truncated`` then tells whether cycles may be missing.
+
+    Args:
+        graph: The directed graph, a networkx graph is converted to a CSRGraph first
+        max_workers: Maximum number of worker processes, 1 searches the components in the
+            current process
+        scc_timings: If given, receives the timing of every searched component
+        ordered: If True, yield the components in the order of their first node
+        max_length: If given, the maximum number of nodes of a cycle
+        max_cycles: If given, the maximum number of cycles
+        stats: If given, receives the search status
+        backend: "johnson" for _johnson_cycles, "networkx" for nx.simple_cycles; a length bound
+            always uses nx.simple_cycles
+
+    Yields:
+        Cycles, where each cycle is a list of nodes
+    """
+    if backend not in ("johnson", "networkx"):
+        raise ValueError(f"Unknown cycle search backend '{backend}', expected 'johnson' or 'networkx'")
+    if not isinstance(graph, CSRGraph):
+        graph = CSRGraph.from_networkx(graph)
+    if stats is None:
+        stats = CycleSearchStats()
+    components = _strongly_connected_components(graph)
+    tasks = [
+        (component, edges, max_length, max_cycles, backend)
+        for component, edges in zip(components, _component_edges(graph, components))
+    ]
+    if max_length is not None and any(len(component) > max_length for component in components):
+        # a component larger than the bound may hold longer cycles
+        stats.truncated = MAX_CYCLE_LENGTH
+    nb_cycles = 0
+
+    def report(component: list[int], cycles: list[list[int]], too_many: bool, seconds: float) -> Iterator[list]:
+        nonlocal nb_cycles
+        logger.info(f"{len(cycles)} cycles found in a component of {len(component)} nodes in {seconds} seconds")
+        if scc_timings is not None:
+            scc_timings.append(SCCTiming(len(component), len(cycles), seconds))
+        for cycle in cycles:
+            if nb_cycles == max_cycles:
+                too_many = True
+                break
+            nb_cycles += 1
+            yield [graph.ids[node] for node in cycle]
+        if too_many:
+            stats.truncated = MAX_CYCLES
+            logger.warning(f"Cycle search stopped after {nb_cycles} cycles: {MAX_CYCLES} reached")
+
+    if len(tasks) < 2 or max_workers == 1:
+        for task in tasks:
+            yield from report(task[0], *_component_cycles(*task))
+            if stats.truncated == MAX_CYCLES:
+                return
+        return
+
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(_component_cycles, *task): task[0] for task in tasks}
+        for future in (futures if ordered else as_completed(futures)):
+            yield from report(futures[future], *future.result())
+            if stats.truncated == MAX_CYCLES:
+                for pending in futures:
+                    pending.cancel()
+                return
+
+
+def find_cycles(
+        graph: nx.Graph | CSRGraph,
+        max_workers: int | None = 1,
+        scc_timings: list[SCCTiming] | None = None,
+        max_length: int | None = None,
+        max_cycles: int | None = None,
+        stats: CycleSearchStats | None = None,
+        backend: str = "johnson",
+) -> list:
+    """
+    Find the elementary cycles of the graph, listed by strongly connected component.
+
+    See ``iter_cycles`` for the arguments.
+    """
+    return list(iter_cycles(graph, max_workers, scc_timings, True, max_length, max_cycles, stats, backend))
+
+
 if __name__ == "__main__":
     ##example:
     graph = {
@@ -21,4 +275,4 @@ if __name__ == "__main__":
     end = '4'
     G = nx.DiGraph(graph)
 
-    print(f"cycles: {find_cycles(G)}")
\ No newline at end of file
+    print(f"cycles: {find_cycles(G)}")
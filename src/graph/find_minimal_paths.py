@@ -1,10 +1,15 @@
-from typing import overload, Any
+import math
+import time
+from dataclasses import dataclass
+from typing import overload, Any, Iterable, Iterator
 
 import networkx as nx
+import pulp
 
 from src.graph.find_cycles import find_cycles
 from src.graph.find_path_with_cycles import find_paths_with_cycles
 from src.graph.find_start_end_node import find_start_end_nodes
+from src.graph.set_cover import lazy_greedy_cover
 
 
 
@@ -31,6 +36,168 @@ def minimum_path_cover_graph(graph: nx.DiGraph):
     return minimum_path_cover_paths(paths)
 
 
+# coverage criteria, each one asks for the subpaths asked by the previous one
+NODE = "node"
+EDGE = "edge"
+EDGE_PAIR = "edge_pair"
+# the number of nodes of the subpaths each criterion asks to cover
+SUBPATH_NODES = {NODE: 1, EDGE: 2, EDGE_PAIR: 3}
+
+
+def _requirements(path: list[Any], criterion: str) -> Iterator[tuple]:
+    """The subpaths of the path the criterion asks to cover: nodes as (u,), edges as (u, v) and so on."""
+    for size in range(1, SUBPATH_NODES[criterion] + 1):
+        yield from zip(*(path[k:] for k in range(size)))
+
+
+def greedy_path_cover(paths: Iterable[list[Any]], criterion: str = EDGE) -> list[list[Any]]:
+    """
+    Pick paths covering every node, edge or pair of successive edges covered by the given paths.
+
+    Each path is encoded as an int bitset of the subpaths it covers. A path is dropped as it
+    arrives when a kept path covers all its subpaths, and a kept path is dropped when a new
+    path covers all of its, greedy never needs a path covering less than another one. So
+    paths can be streamed from ``iter_paths_with_cycles`` and memory grows with the number of
+    kept paths, none covering all the subpaths of another, not with the number of paths.
+    The paths are then picked by lazy greedy set cover, which uses at most H(n) ≈ ln(n) + 1
+    times as many paths as the fewest possible, n being the most subpaths a path covers.
+
+    Args:
+        paths: The candidate paths
+        criterion: NODE, EDGE or EDGE_PAIR, covering the edges also covers the nodes and
+            covering the edge pairs also covers the edges
+
+    Returns:
+        The cover, in the order the paths were picked
+    """
+    if criterion not in SUBPATH_NODES:
+        raise ValueError(f"Unknown coverage criterion '{criterion}', expected one of {list(SUBPATH_NODES)}")
+    mask_of = {}  # the bit of every subpath
+    kept = {}  # bitset -> path, no kept bitset holds another one
+    union = 0  # the subpaths covered by the paths seen so far
+    for path in paths:
+        bitset = 0
+        for requirement in _requirements(path, criterion):
+            mask = mask_of.get(requirement)
+            if mask is None:
+                mask = mask_of[requirement] = 1 << len(mask_of)
+            bitset |= mask
+        # a path adding a subpath to the union cannot be covered by a kept path
+        if not bitset & ~union and any(not bitset & ~other for other in kept):
+            continue
+        union |= bitset
+        for other in [other for other in kept if not other & ~bitset]:
+            del kept[other]
+        kept[bitset] = path
+    candidates = list(kept.values())
+    return [candidates[i] for i in lazy_greedy_cover(list(kept))]
+
+
+# statuses of a PathCover
+OPTIMAL = "optimal"
+FEASIBLE = "feasible"  # the time limit was reached, the solver's best cover is kept
+GREEDY = "greedy"  # no solver available or no cover better than the greedy one found in time
+
+
+@dataclass
+class PathCover:
+    """Result of ``minimum_path_cover_ilp``."""
+    paths: list[list[Any]]
+    status: str  # OPTIMAL, FEASIBLE or GREEDY
+    gap: float | None  # (number of paths - lower bound) / number of paths, None if no bound is known
+    seconds: float
+
+
+def _covered_elements(path: list[Any], nodes: bool) -> set[tuple]:
+    """The edges of the path, as (u, v), and with nodes its nodes, as (u,)."""
+    elements = set(zip(path, path[1:]))
+    if nodes:
+        elements.update((node,) for node in path)
+    return elements
+
+
+def minimum_path_cover_ilp(
+        paths: list[list[Any]],
+        nodes: bool = False,
+        time_limit: float = 5.0,
+        gap: float = 0.0,
+        solver: str | None = None,
+) -> PathCover:
+    """
+    Find the fewest paths covering every edge, and with ``nodes`` every node, covered by the
+    given paths.
+
+    Picking the paths is a set cover, solved as an integer linear program with pulp: one binary
+    variable per path, one constraint per edge or node asking for at least one path through
+    it. The greedy cover is computed first and kept when no solver is available or when the
+    solver finds no smaller cover within the time limit. Paths covering the same elements are
+    only given once to the solver.
+
+    The lower bound of the gap comes from the linear relaxation of the program.
+
+    Args:
+        paths: The candidate paths, e.g. from ``find_paths_with_cycles``
+        nodes: If True, cover the nodes as well as the edges
+        time_limit: Maximum solving time in seconds
+        gap: Relative optimality gap at which the solver may stop
+        solver: Name of the pulp solver, see ``pulp.listSolvers``, defaults to the first
+            available one
+
+    Returns:
+        The cover, in the order of the given paths, with its status and gap
+    """
+    begin = time.perf_counter()
+    first_path = {}
+    for i, path in enumerate(paths):
+        elements = frozenset(_covered_elements(path, nodes))
+        if elements:
+            first_path.setdefault(elements, i)
+    element_sets = list(first_path)
+    candidates = list(first_path.values())
+    bit_of = {element: bit for bit, element in enumerate(set().union(*element_sets))}
+    bitsets = [sum(1 << bit_of[element] for element in elements) for elements in element_sets]
+    cover = sorted(candidates[i] for i in lazy_greedy_cover(bitsets))
+    status = GREEDY
+    bound = None
+
+    if solver is None:
+        available = pulp.listSolvers(onlyAvailable=True)
+        solver = available[0] if available else None
+    if len(cover) <= 1:
+        status, bound = OPTIMAL, len(cover)
+    elif solver is not None:
+        covering = {}
+        for i, elements in enumerate(element_sets):
+            for element in elements:
+                covering.setdefault(element, []).append(i)
+        problem = pulp.LpProblem("path_cover", pulp.LpMinimize)
+        chosen = [pulp.LpVariable(f"path_{i}", cat=pulp.LpBinary) for i in range(len(element_sets))]
+        problem += pulp.lpSum(chosen)
+        for sets in covering.values():
+            problem += pulp.lpSum(chosen[i] for i in sets) >= 1
+
+        problem.solve(pulp.getSolver(solver, msg=False, timeLimit=time_limit, mip=False))
+        if problem.status == pulp.LpStatusOptimal:
+            # the relaxation is a lower bound, rounded up with some slack for the solver's tolerance
+            bound = math.ceil(pulp.value(problem.objective) - 1e-6)
+
+        if bound is None or bound < len(cover):
+            remaining = max(time_limit - (time.perf_counter() - begin), 1.0)
+            problem.solve(pulp.getSolver(solver, msg=False, timeLimit=remaining, gapRel=gap))
+            if problem.sol_status in (pulp.LpSolutionOptimal, pulp.LpSolutionIntegerFeasible):
+                solution = [candidates[i] for i, variable in enumerate(chosen) if variable.varValue > 0.5]
+                if problem.sol_status == pulp.LpSolutionOptimal and gap == 0:
+                    bound = len(solution)
+                if len(solution) < len(cover):
+                    cover = sorted(solution)
+                    status = FEASIBLE
+        if bound is not None and bound >= len(cover):
+            status = OPTIMAL
+
+    gap_found = (len(cover) - bound) / len(cover) if bound is not None and cover else None
+    return PathCover([paths[i] for i in cover], status, gap_found, time.perf_counter() - begin)
+
+
 
 
 if __name__ == "__main__":
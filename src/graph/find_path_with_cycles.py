@@ -1,87 +1,743 @@
 import logging
+import os
+import time
+from functools import partial
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Iterable, Iterator
 
 import networkx as nx
 
+from src.graph.csr import CSRGraph
+from src.graph.cycle_index import CycleIndex
+from src.graph.loop_nesting_forest import LoopNestingForest
+
 logger = logging.getLogger(__name__)
 
-def _generate_rotated_lists(lst):
-    n: int = len(lst)
-    return [lst[i:] + lst[:i+1] for i in range(n)]
+def _index_cycle_edges(index: CycleIndex) -> dict[tuple[int, int], list[tuple[int, int]]]:
+    """
+    Map every edge to the cycles going through it, as ``(cycle id, loop id)`` pairs.
+
+    Going around a cycle and coming back to one of its nodes is a loop, every (cycle, node)
+    pair gets a dense loop id; the loop id of a pair is the one of the target of the edge.
+    """
+    first_loops = [0]
+    for length in index.lengths:
+        first_loops.append(first_loops[-1] + length)
+    return {
+        (u, v): [(cycle_id, first_loops[cycle_id] + index.positions[cycle_id][v]) for cycle_id in cycle_ids]
+        for (u, v), cycle_ids in index.edge_cycles.items()
+    }
+
+
+def _reaching_nodes(adjacency: list[list[int]], end: set[int]) -> bytearray:
+    """Bitset over the nodes, set for the nodes from which an end node can be reached."""
+    predecessors = [[] for _ in adjacency]
+    for node, neighbors in enumerate(adjacency):
+        for neighbor in neighbors:
+            predecessors[neighbor].append(node)
+
+    reaching = bytearray(len(adjacency))
+    stack = list(end)
+    for node in stack:
+        reaching[node] = 1
+    while stack:
+        for predecessor in predecessors[stack.pop()]:
+            if not reaching[predecessor]:
+                reaching[predecessor] = 1
+                stack.append(predecessor)
+    return reaching
+
+
+def _to_search_input(
+        graph: nx.DiGraph | CSRGraph,
+        start: str,
+        end: str | list[str],
+        cycles: Iterable[list] | CycleIndex | LoopNestingForest,
+):
+    """
+    Convert the arguments of the path search to a CSRGraph and node numbers, and pick the
+    rule deciding how a path may go around loops.
+
+    Returns:
+        The graph, start, the set of end nodes, the ``extend`` function of the rule (see
+        _extend and _extend_loops) and the rule's state of a path made of start only
+    """
+    if not isinstance(end, list):
+        end = [end]
+    if not isinstance(graph, CSRGraph):
+        graph = CSRGraph.from_networkx(graph)
+
+    start = graph.index[start]
+    end = {graph.index[node] for node in end}
+    if isinstance(cycles, LoopNestingForest):
+        edge_loops = {
+            (graph.index[u], graph.index[v]): loop_id
+            for loop_id, loop in enumerate(cycles.loops) for u, v in loop.back_edges
+        }
+        return graph, start, end, partial(_extend_loops, edge_loops), (0,)
+
+    if isinstance(cycles, CycleIndex):
+        cycles = cycles.cycles
+    cycles = CycleIndex([graph.index[node] for node in cycle] for cycle in cycles)
+    return graph, start, end, partial(_extend, _index_cycle_edges(cycles), cycles.lengths), ({}, 0, 0)
+
+
+# outcomes of extending a path by one edge
+_REJECTED, _FOUND, _EXTENDED = range(3)
+
+
+def _extend(
+        edge_cycles: dict[tuple[int, int], list[tuple[int, int]]],
+        cycle_lengths: list[int],
+        current: int,
+        neighbor: int,
+        neighbor_is_end: bool,
+        cycle_runs: dict[int, int],
+        completed_loops: int,
+        used_cycles: int,
+):
+    """
+    Extend the cycle usage state of a path ending at current with the edge (current, neighbor).
+
+    The state is made of
+    - cycle_runs, mapping each cycle containing the last edge to the number of consecutive
+      trailing edges of the path that belong to it,
+    - completed_loops, a bitmask of the loop ids (see _index_cycle_edges) for which the path
+      went once around the cycle and came back to the node, a path may not do the same loop twice,
+    - used_cycles, a bitmask of the cycles with at least one completed loop.
+
+    Returns:
+        ``(_REJECTED, None)`` if the new path does a loop twice, ``(_FOUND, None)`` if the new
+        path is complete and must be kept right away, otherwise ``(_EXTENDED, new_state)``.
+    """
+    new_cycle_runs = {}
+    new_loops = 0
+    new_cycles = 0
+    reused_cycles = 0
+
+    # only the cycles going through the new edge can progress, all others restart at 0
+    for cycle_id, loop_id in edge_cycles.get((current, neighbor), ()):
+        run = cycle_runs.get(cycle_id, 0) + 1
+        new_cycle_runs[cycle_id] = run
+        if run >= cycle_lengths[cycle_id]:
+            if completed_loops >> loop_id & 1:
+                reused_cycles |= 1 << cycle_id
+            else:
+                new_loops |= 1 << loop_id
+                new_cycles |= 1 << cycle_id
+
+    if neighbor_is_end and used_cycles:
+        # the path ends after already using a cycle: keep it right away unless a cycle
+        # considered before the first used one is done twice
+        before_first_reused = (reused_cycles & -reused_cycles) - 1 if reused_cycles else -1
+        if used_cycles & ~reused_cycles & before_first_reused:
+            return _FOUND, None
+    if reused_cycles:
+        return _REJECTED, None
+
+    return _EXTENDED, (new_cycle_runs, completed_loops | new_loops, used_cycles | new_cycles)
+
+
+def _extend_loops(
+        edge_loops: dict[tuple[int, int], int],
+        current: int,
+        neighbor: int,
+        neighbor_is_end: bool,
+        used_loops: int,
+):
+    """
+    Extend the loop usage state of a path with the edge (current, neighbor), for the "each
+    loop at most once" rule of a LoopNestingForest.
+
+    The state is used_loops, a bitmask of the loops whose back edges the path already took;
+    edge_loops maps every back edge to its loop. Every cycle goes through a back edge, so
+    taking each loop's back edges at most once keeps the paths finite.
+
+    Returns:
+        ``(_REJECTED, None)`` if the edge goes back to a loop the path already went around,
+        otherwise ``(_EXTENDED, new_state)``.
+    """
+    loop_id = edge_loops.get((current, neighbor))
+    if loop_id is None:
+        return _EXTENDED, (used_loops,)
+    if used_loops >> loop_id & 1:
+        return _REJECTED, None
+    return _EXTENDED, (used_loops | 1 << loop_id,)
+
+
+def path_chain(path: list[int]) -> tuple:
+    """
+    Store path as a chain of ``(node, previous cell, length)`` cells ending with its last node.
+
+    Extending a path is then a new cell sharing the cells of its prefix instead of a copy.
+    """
+    chain = None
+    for length, node in enumerate(path, 1):
+        chain = (node, chain, length)
+    return chain
+
+
+def materialize(chain: tuple) -> list[int]:
+    """The nodes of a path chain, from the first one."""
+    path = []
+    while chain is not None:
+        path.append(chain[0])
+        chain = chain[1]
+    path.reverse()
+    return path
+
+
+# reasons for a search to stop before finding every path, see PathSearchStats.truncated
+MAX_PATHS = "max_paths"
+MAX_PATH_LENGTH = "max_path_length"
+MAX_EXPANDED = "max_expanded"
+TIMEOUT = "timeout"
+
+
+@dataclass
+class PathSearchBudget:
+    """
+    Limits of a path search, None means unlimited.
+
+    Attributes:
+        max_paths: Stop after finding this many paths.
+        max_path_length: Do not extend paths with more nodes than this, longer paths are skipped.
+        max_expanded: Stop after expanding this many nodes.
+        timeout: Stop after this many seconds.
+    """
+    max_paths: int | None = None
+    max_path_length: int | None = None
+    max_expanded: int | None = None
+    timeout: float | None = None
+
+
+@dataclass
+class PathSearchStats:
+    """Counters filled by ``find_paths_with_cycles`` and ``iter_paths_with_cycles`` when given one."""
+    duplicates: int = 0  # paths found more than once and dropped
+    expanded: int = 0  # nodes whose successors were explored
+    pruned: int = 0  # successors skipped because no end node can be reached from them
+    truncated: str | None = None  # the budget that was hit (MAX_PATHS, ...), None if the search is complete
+
+
+def iter_paths_with_cycles(
+        graph: nx.DiGraph | CSRGraph,
+        start: str,
+        end: str | list[str],
+        cycles: Iterable[list] | CycleIndex | LoopNestingForest,
+        stats: PathSearchStats | None = None,
+        deduplicate: bool = False,
+        budget: PathSearchBudget | None = None,
+) -> Iterator[list[str]]:
+    """
+    Yield the paths of ``find_paths_with_cycles`` one by one, as the search finds them.
+
+    The search never reaches the same path twice, so by default found paths are not
+    remembered and memory does not grow with the number of paths.
+
+    When a limit of the budget is hit the search stops, or skips the paths that are too long,
+    and records the reason in ``stats.truncated``; the paths yielded until then are kept.
+
+    Args:
+        graph: The directed graph, a networkx graph is converted to a CSRGraph first
+        start: The starting node
+        end: The ending node
+        cycles: The cycles, where each cycle is a list of nodes, read once so it may be a generator
+            such as iter_cycles(graph), or their CycleIndex. A LoopNestingForest instead lets
+            each path go around each of its loops at most once
+        stats: If given, receives the search counters
+        deduplicate: If True, remember the found paths and drop any path found twice
+        budget: If given, the limits of the search
+
+    Yields:
+        Paths, where each path is a list of nodes
+    """
+    # the search runs on node numbers, ids are restored when a path is returned
+    graph, start, end, extend, initial_state = _to_search_input(graph, start, end, cycles)
+    ids = graph.ids
+    adjacency = graph.adjacency()
+
+    if stats is None:
+        stats = PathSearchStats()
+    if budget is None:
+        budget = PathSearchBudget()
+    max_paths = budget.max_paths
+    max_path_length = budget.max_path_length
+    max_expanded = budget.max_expanded
+    deadline = time.monotonic() + budget.timeout if budget.timeout is not None else None
+    nb_paths = 0
+
+    # found paths as tuples for constant time duplicate checks
+    found_paths = set()
+
+    def is_new(path: list[int]) -> bool:
+        if not deduplicate:
+            return True
+        key = tuple(path)
+        if key in found_paths:
+            logger.info(f"Path already exists: {path}")
+            stats.duplicates += 1
+            return False
+        found_paths.add(key)
+        return True
+
+    def stop(reason: str) -> None:
+        stats.truncated = reason
+        logger.warning(f"Path search stopped after {nb_paths} paths: {reason} reached")
+
+    stack = [(start, path_chain([start]), initial_state)]
+    reaching = _reaching_nodes(adjacency, end)
+    for path in _search(
+            adjacency, end, extend, reaching, stack, stats,
+            max_path_length, max_expanded, deadline,
+    ):
+        if is_new(path):
+            if nb_paths == max_paths:
+                stop(MAX_PATHS)
+                return
+            nb_paths += 1
+            yield [ids[node] for node in path]
+    if stats.truncated in (MAX_EXPANDED, TIMEOUT):
+        stop(stats.truncated)
+
+
+def _search(
+        adjacency: list[list[int]],
+        end: set[int],
+        extend,
+        reaching: bytearray,
+        stack: list,
+        stats: PathSearchStats,
+        max_path_length: int | None = None,
+        max_expanded: int | None = None,
+        deadline: float | None = None,
+) -> Iterator[list[int]]:
+    """
+    Depth first search of the paths from the entries of ``stack``, the top entry first.
+
+    Successors outside ``reaching`` (see _reaching_nodes) cannot lead to a path and are skipped.
+    When ``max_expanded`` or ``deadline`` is reached, ``stats.truncated`` is set and the search
+    returns, leaving the unexplored entries on ``stack`` so that it can be resumed.
+
+    Yields:
+        Paths as lists of node numbers
+    """
+    # Stack-based DFS to avoid recursion issues
+    # Each entry is (current_node, path_so_far, state), path_so_far is a chain (see path_chain)
+    # and state the loop usage of the path, updated by extend (see _extend and _extend_loops)
+    while stack:
+        entry = stack.pop()
+        current, path, state = entry
+
+        # If we reached the end, add the path to results
+        if current in end:
+            path = materialize(path)
+            logger.info(f"Found path: {path}")
+            yield path
+            continue
 
-def _is_contiguous_sublist(main_list, sublist):
-    n, m = len(main_list), len(sublist)
-    return [main_list[i:i + m] == sublist for i in range(n - m + 1)].count(True)
+        if max_path_length is not None and path[2] >= max_path_length:
+            stats.truncated = stats.truncated or MAX_PATH_LENGTH
+            continue
+        if stats.expanded == max_expanded or (deadline is not None and time.monotonic() >= deadline):
+            stats.truncated = MAX_EXPANDED if stats.expanded == max_expanded else TIMEOUT
+            stack.append(entry)
+            return
 
+        stats.expanded += 1
+        for neighbor in adjacency[current]:
+            if not reaching[neighbor]:
+                stats.pruned += 1
+                continue
+            outcome, new_state = extend(current, neighbor, neighbor in end, *state)
+            if outcome == _REJECTED:
+                continue
 
-def _occur_cycle_in_path(path, cycle):
-    """Count occurrences of any cyclic rotation of cycle in path as contiguous sublists."""
-    rotated_cycles = _generate_rotated_lists(cycle)
-    return [_is_contiguous_sublist(path, rotated) for rotated in rotated_cycles]
+            new_path = (neighbor, path, path[2] + 1)
+            if outcome == _FOUND:
+                new_path = materialize(new_path)
+                logger.info(f"Found path: {new_path}")
+                yield new_path
+                continue
+            stack.append((neighbor, new_path, new_state))
 
 
-def find_paths_with_cycles(graph: nx.DiGraph, start: str, end: str | list[str], cycles: list) -> list[list[str]]:
+def find_paths_with_cycles(
+        graph: nx.DiGraph | CSRGraph,
+        start: str,
+        end: str | list[str],
+        cycles: Iterable[list] | CycleIndex | LoopNestingForest,
+        stats: PathSearchStats | None = None,
+        budget: PathSearchBudget | None = None,
+) -> list[list[str]]:
     """
     Find all paths from start to end in a directed graph where each path
     can use each cycles at most once.
 
+    With a budget, the search may stop early and return the paths found so far, check
+    ``stats.truncated`` to know whether the result is complete.
+
     Args:
-        graph: A dictionary representing the directed graph {node: [neighbors]}
+        graph: The directed graph, a networkx graph is converted to a CSRGraph first
         start: The starting node
         end: The ending node
-        cycles: A list of cycles, where each cycle is a list of nodes
+        cycles: The cycles, where each cycle is a list of nodes, read once so it may be a generator
+            such as iter_cycles(graph), or their CycleIndex. A LoopNestingForest instead lets
+            each path go around each of its loops at most once
+        stats: If given, receives the search counters
+        budget: If given, the limits of the search
 
     Returns:
         A list of paths, where each path is a list of nodes
     """
-    if not isinstance(end, list):
-        end = [end]
+    return list(iter_paths_with_cycles(graph, start, end, cycles, stats=stats, deduplicate=True, budget=budget))
 
-    # Initialize result list
-    all_paths = []
+# search data of the pool workers, set once per process by _init_worker
+_worker_search = None
 
-    # Stack-based DFS to avoid recursion issues
-    # Each entry is (current_node, path_so_far, used_special_edge)
-    stack = [(start, [start], list())]
 
-    cycles = [cycle for cycle in cycles]
+def _init_worker(adjacency, end, extend, reaching):
+    global _worker_search
+    _worker_search = (adjacency, end, extend, reaching)
+
+
+def _search_subtrees(stack: list, max_expanded: int):
+    """Pool task: search from the entries of stack and give back the entries left when max_expanded is reached."""
+    stats = PathSearchStats()
+    stack = _from_lists(stack)
+    paths = list(_search(*_worker_search, stack, stats, max_expanded=max_expanded))
+    return paths, _to_lists(stack), stats.expanded, stats.pruned
+
+
+# path chains are nested as deep as the paths are long, too deep for pickle, so the stack
+# entries sent to and from the pool hold their path as a list
+def _to_lists(stack: list) -> list:
+    return [(node, materialize(path), state) for node, path, state in stack]
+
+
+def _from_lists(stack: list) -> list:
+    return [(node, path_chain(path), state) for node, path, state in stack]
+
+
+def _split(stack: list, parts: int) -> list[list]:
+    """Split stack in contiguous parts, listed in the order the DFS would search them (top first)."""
+    size = -(-len(stack) // parts)
+    return [stack[i:i + size] for i in range(0, len(stack), size)][::-1]
+
+
+def find_paths_with_cycles_parallel(
+        graph: nx.DiGraph | CSRGraph,
+        start: str,
+        end: str | list[str],
+        cycles: Iterable[list] | CycleIndex | LoopNestingForest,
+        max_workers: int | None = None,
+        stats: PathSearchStats | None = None,
+        ordered: bool = True,
+        chunk_expanded: int = 10_000,
+) -> list[list[str]]:
+    """
+    Find the paths of ``find_paths_with_cycles`` on several processes.
+
+    The DFS is expanded from start until its stack holds a few entries per worker, the stack
+    is then split in parts searched in a process pool. A part stops after expanding
+    ``chunk_expanded`` nodes and sends back its unexplored entries, which are split again
+    over the pool, so a subtree much larger than the others is shared between the workers.
+
+    Each part is searched like the serial DFS would search it, so putting the paths of the
+    parts back in stack order gives exactly the serial result.
+
+    Args:
+        graph: The directed graph, a networkx graph is converted to a CSRGraph first
+        start: The starting node
+        end: The ending node
+        cycles: The cycles, where each cycle is a list of nodes, read once so it may be a generator
+            such as iter_cycles(graph), or their CycleIndex. A LoopNestingForest instead lets
+            each path go around each of its loops at most once
+        max_workers: The number of processes, defaults to the number of CPUs
+        stats: If given, receives the search counters
+        ordered: If True, return the paths in the order of find_paths_with_cycles, otherwise
+            in the order the parts finish
+        chunk_expanded: The number of nodes a part expands before giving its work back
+
+    Returns:
+        A list of paths, where each path is a list of nodes
+    """
+    graph, start, end, extend, initial_state = _to_search_input(graph, start, end, cycles)
+    adjacency = graph.adjacency()
+    search = (adjacency, end, extend, _reaching_nodes(adjacency, end))
+    if stats is None:
+        stats = PathSearchStats()
+    max_workers = max_workers or os.cpu_count() or 1
+
+    # expand the first levels here, one node at a time, until there is work for every worker
+    root = [[], []]  # the paths found by a part then the parts its unexplored entries were split in
+    stack = [(start, path_chain([start]), initial_state)]
+    while stack and len(stack) < 4 * max_workers:
+        root[0].extend(_search(*search, stack, stats, max_expanded=stats.expanded + 1))
+    stats.truncated = None
+
+    completed = []  # parts in the order they finish, when ordering is not requested
+    with ProcessPoolExecutor(max_workers, initializer=_init_worker, initargs=search) as executor:
+        def submit(part_stack: list, parent: list) -> None:
+            for entries in _split(part_stack, 2 * max_workers):
+                part = [[], []]
+                parent[1].append(part)
+                futures[executor.submit(_search_subtrees, entries, chunk_expanded)] = part
+
+        futures = {}
+        if stack:
+            submit(_to_lists(stack), root)
+        while futures:
+            done, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                part = futures.pop(future)
+                paths, part_stack, expanded, pruned = future.result()
+                part[0] = paths
+                completed.append(part)
+                stats.expanded += expanded
+                stats.pruned += pruned
+                if part_stack:
+                    submit(part_stack, part)
+
+    # a part's paths come before the paths of its split entries, walk the parts depth first
+    if ordered:
+        completed = []
+        parts = [root]
+        while parts:
+            part = parts.pop()
+            completed.append(part)
+            parts.extend(reversed(part[1]))
+    else:
+        completed.insert(0, root)
+
+    ids = graph.ids
+    found_paths = set()
+    result = []
+    for paths, _ in completed:
+        for path in paths:
+            key = tuple(path)
+            if key in found_paths:
+                stats.duplicates += 1
+                continue
+            found_paths.add(key)
+            result.append([ids[node] for node in path])
+    return result
+
+def _state_key(node: int, state: tuple) -> tuple:
+    """The hashable key of a path ending at node with the given cycle usage state."""
+    return node, *(frozenset(part.items()) if isinstance(part, dict) else part for part in state)
+
+
+def _state_graph(
+        adjacency: list[list[int]],
+        start: int,
+        end: set[int],
+        extend,
+        initial_state: tuple,
+        ids: list[str],
+) -> tuple[list[tuple], dict[tuple, list[tuple[int, tuple | None]]]]:
+    """
+    Explore the (node, cycle usage state) pairs reachable from start, the nodes of the state graph.
+
+    Two paths reaching the same node with the same cycle usage state have the same
+    continuations, so paths of the search are paths of the state graph, which is acyclic as
+    long as the cycles hold every cycle of the graph.
+
+    Returns:
+        The keys of the states in DFS post-order, every state after the states it leads to, and
+        the transitions of every state as ``(neighbor, key)`` pairs, key being None when the
+        path ends at neighbor
+
+    Raises:
+        ValueError: If a path can go around a cycle missing from cycles indefinitely
+    """
+    reaching = _reaching_nodes(adjacency, end)
+    order = []
+    transitions = {}
+    in_progress = set()
 
+    # Each entry is (node, state, expanded), expanded is False until the state has been expanded
+    stack = [(start, initial_state, False)]
     while stack:
-        current, path, used_cycled = stack.pop()
+        node, state, expanded = stack.pop()
+        key = _state_key(node, state)
 
-        # If we reached the end, add the path to results
-        if current in end:
-            logger.info(f"Found path: {path}")
-            if path in all_paths:
-                logger.info(f"Path already exists: {path}")
+        if not expanded:
+            if key in in_progress:
+                raise ValueError(f"Infinite number of paths, a cycle through '{ids[node]}' is missing")
+            if key in transitions:
                 continue
-            all_paths.append(path)
+            in_progress.add(key)
+
+            successors = []
+            stack.append((node, state, True))
+            for neighbor in adjacency[node]:
+                if not reaching[neighbor]:
+                    continue
+                outcome, new_state = extend(node, neighbor, neighbor in end, *state)
+                if outcome == _REJECTED:
+                    continue
+                if outcome == _FOUND or neighbor in end:
+                    successors.append((neighbor, None))  # one path ending at neighbor
+                    continue
+                successor = _state_key(neighbor, new_state)
+                successors.append((neighbor, successor))
+                if successor not in transitions or successor in in_progress:
+                    stack.append((neighbor, new_state, False))
+            transitions[key] = successors
             continue
 
-        for neighbor in graph[current]:
-            new_path = path + [neighbor]
-            new_used_cycles = used_cycled.copy()
-
-            # iterate over cycles to check if the new path forms a cycle
-            for cycle in cycles:
-                count_cycle = _occur_cycle_in_path(new_path, cycle)
-                if any(count > 1 for count in count_cycle):
-                    break
-                elif any(count == 1 for count in count_cycle):
-                    if cycle in new_used_cycles:
-                        if neighbor in end:
-                            logger.info(f"Found path: {path}")
-                            if path in all_paths:
-                                logger.info(f"Path already exists: {path}")
-                                continue
-                            all_paths.append(new_path)
-                            break
-                        continue
-                    new_used_cycles.append(cycle)
+        order.append(key)
+        in_progress.discard(key)
+    return order, transitions
 
+
+def _forget_left_components(extend, component: list[int], natural_loops: bool):
+    """
+    Wrap the ``extend`` function of a path rule (see _extend and _extend_loops) so the state of
+    a path leaving a strongly connected component forgets the cycles of the components it left.
+
+    Every cycle is inside one component and a path never comes back to a component it left,
+    so these cycles can no longer be gone around again. Only the lowest used cycle is kept,
+    it is all ``_extend`` needs to know to let a path end. The paths are the same, but the
+    states no longer tell apart the ways the path went around the cycles of earlier
+    components, so the states of the paths through a row of components add up instead of
+    multiplying.
+    """
+    def extend_forgetting(current: int, neighbor: int, neighbor_is_end: bool, *state):
+        outcome, new_state = extend(current, neighbor, neighbor_is_end, *state)
+        if new_state is not None and component[current] != component[neighbor]:
+            if natural_loops:
+                new_state = (0,)
             else:
-                stack.append((neighbor, new_path, new_used_cycles))
+                used_cycles = new_state[2]
+                new_state = ({}, 0, used_cycles & -used_cycles)
+        return outcome, new_state
+    return extend_forgetting
+
+
+class PathStates:
+    """
+    The (node, cycle usage state) pairs the paths of ``find_paths_with_cycles`` go through,
+    for the searches remembering states instead of paths.
+
+    Two paths reaching the same node with the same state have the same continuations. The
+    state of a path leaving a strongly connected component forgets the cycles of the
+    component (see _forget_left_components), the paths are the same.
+
+    Attributes:
+        graph: The graph, as a CSRGraph
+        start: The start node number
+        end: The end node numbers
+        initial_state: The state of the path made of start only
+        loops: The nodes of every cycle, or loop of a LoopNestingForest, the bit of a loop
+            in ``used_loops`` being its position
+        reaching: Bitset over the nodes, set for the nodes from which an end node can be reached
+    """
+
+    def __init__(
+            self,
+            graph: nx.DiGraph | CSRGraph,
+            start: str,
+            end: str | list[str],
+            cycles: Iterable[list] | CycleIndex | LoopNestingForest,
+    ):
+        if not isinstance(cycles, (CycleIndex, LoopNestingForest)):
+            cycles = CycleIndex(cycles)
+        graph, start, end, extend, initial_state = _to_search_input(graph, start, end, cycles)
+        self.graph = graph
+        self.start = start
+        self.end = end
+        self.initial_state = initial_state
+        self._natural_loops = isinstance(cycles, LoopNestingForest)
+        if self._natural_loops:
+            self.loops = [sorted(graph.index[node] for node in loop.nodes) for loop in cycles.loops]
+        else:
+            self.loops = [[graph.index[node] for node in cycle] for cycle in cycles.cycles]
+        self.reaching = _reaching_nodes(graph.adjacency(), end)
+        _, component = graph.strongly_connected_components()
+        self._extend = _forget_left_components(extend, component, self._natural_loops)
+
+    def key(self, node: int, state: tuple) -> tuple:
+        """The hashable key of a path ending at node in state."""
+        return _state_key(node, state)
+
+    def successors(self, node: int, state: tuple) -> list[tuple[int, tuple | None]]:
+        """
+        The nodes a path ending at node in state can go on to, each with the state of the
+        longer path, None when the path ends there.
+        """
+        successors = []
+        for neighbor in self.graph.adjacency()[node]:
+            if not self.reaching[neighbor]:
+                continue
+            outcome, new_state = self._extend(node, neighbor, neighbor in self.end, *state)
+            if outcome == _REJECTED:
+                continue
+            successors.append((neighbor, None if outcome == _FOUND or neighbor in self.end else new_state))
+        return successors
+
+    def used_loops(self, state: tuple) -> int:
+        """The cycles, or loops of a LoopNestingForest, a path in state went around, as a bitmask."""
+        return state[0] if self._natural_loops else state[2]
+
+    def state_graph(self) -> tuple[list[tuple], dict[tuple, list[tuple[int, tuple | None]]]]:
+        """The states reachable from start and their transitions, see _state_graph."""
+        graph = self.graph
+        return _state_graph(graph.adjacency(), self.start, self.end, self._extend, self.initial_state, graph.ids)
+
+
+def count_paths_with_cycles(
+        graph: nx.DiGraph | CSRGraph,
+        start: str,
+        end: str | list[str],
+        cycles: Iterable[list] | CycleIndex | LoopNestingForest,
+) -> dict[str, int]:
+    """
+    Count the paths ``find_paths_with_cycles`` would find, per end node, without enumerating them.
+
+    The number of paths is computed once per (node, cycle usage) state by dynamic programming
+    over the state graph (see _state_graph). The states forget the cycles of the strongly
+    connected components a path left (see PathStates), so the paths after a component are
+    counted once, not once per way of going around its cycles.
+
+    Args:
+        graph: The directed graph, a networkx graph is converted to a CSRGraph first
+        start: The starting node
+        end: The ending node
+        cycles: The cycles, where each cycle is a list of nodes, read once so it may be a generator
+            such as iter_cycles(graph), or their CycleIndex. A LoopNestingForest instead lets
+            each path go around each of its loops at most once
+
+    Returns:
+        The number of paths ending at each end node
+
+    Raises:
+        ValueError: If a path can go around a cycle missing from cycles indefinitely
+    """
+    end_nodes = end if isinstance(end, list) else [end]
+    states = PathStates(graph, start, end, cycles)
+    graph = states.graph
+    if states.start in states.end:
+        return {node: int(node == graph.ids[states.start]) for node in end_nodes}
+    order, transitions = states.state_graph()
+
+    # number of paths per end node from each state, successors first
+    path_counts = {}
+    for key in order:
+        counts = {}
+        for neighbor, successor in transitions[key]:
+            if successor is None:
+                counts[neighbor] = counts.get(neighbor, 0) + 1
+                continue
+            for end_node, count in path_counts[successor].items():
+                counts[end_node] = counts.get(end_node, 0) + count
+        path_counts[key] = counts
+
+    counts = path_counts[order[-1]]
+    return {node: counts.get(graph.index[node], 0) for node in end_nodes}
 
-    return all_paths
 
 if __name__ == "__main__":
     ##example:
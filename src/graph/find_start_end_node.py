@@ -1,9 +1,16 @@
 import networkx as nx
+import numpy as np
 
+from src.graph.csr import CSRGraph
 
-def find_start_end_nodes(graph: nx.DiGraph) -> tuple[str, list[str]]:
-    start_nodes = [n for n, d in graph.in_degree() if d == 0]
-    end_nodes = [n for n, d in graph.out_degree() if d == 0]
+
+def find_start_end_nodes(graph: nx.DiGraph | CSRGraph) -> tuple[str, list[str]]:
+    if isinstance(graph, CSRGraph):
+        start_nodes = [graph.ids[i] for i in np.flatnonzero(graph.in_degree() == 0).tolist()]
+        end_nodes = [graph.ids[i] for i in np.flatnonzero(graph.out_degree() == 0).tolist()]
+    else:
+        start_nodes = [n for n, d in graph.in_degree() if d == 0]
+        end_nodes = [n for n, d in graph.out_degree() if d == 0]
 
     if len(end_nodes) == 0:
         raise ValueError("The graph does not have an ending node.")
@@ -0,0 +1,158 @@
+import hashlib
+import logging
+import os
+import pickle
+import zlib
+from pathlib import Path
+from typing import Any, Callable
+
+import networkx as nx
+
+from src.graph.flowchart.parse import PARSER_VERSION, check_drawio_path, parse_drawio, parse_drawio_pages
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = Path.home() / ".cache" / "graphe"
+DEFAULT_MAX_CACHE_SIZE = 64 * 1024 * 1024  # bytes
+CACHE_SUFFIX = ".graph"
+
+_HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def _cache_key(file_path: Path, kind: str) -> str:
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        while chunk := f.read(_HASH_CHUNK_SIZE):
+            digest.update(chunk)
+    return f"{digest.hexdigest()}-{kind}-v{PARSER_VERSION}"
+
+
+def _graph_to_payload(G: nx.DiGraph) -> tuple[list, list]:
+    return list(G.nodes(data=True)), list(G.edges(data=True))
+
+
+def _payload_to_graph(payload: tuple[list, list]) -> nx.DiGraph:
+    nodes, edges = payload
+    G = nx.DiGraph()
+    G.add_nodes_from(nodes)
+    G.add_edges_from(edges)
+    return G
+
+
+def _dump(payload, cache_file: Path):
+    data = zlib.compress(pickle.dumps(payload, protocol=pickle.HIGHEST_PROTOCOL))
+
+    # write then rename so that a concurrent reader never sees a partial file
+    tmp_file = cache_file.with_suffix(f"{CACHE_SUFFIX}.{os.getpid()}.tmp")
+    try:
+        tmp_file.write_bytes(data)
+        os.replace(tmp_file, cache_file)
+    except OSError:
+        tmp_file.unlink(missing_ok=True)
+        raise
+
+
+def _load(cache_file: Path):
+    return pickle.loads(zlib.decompress(cache_file.read_bytes()))
+
+
+def _evict(cache_dir: Path, max_size: int):
+    """
+    Remove the least recently used cache files until the cache fits in max_size bytes.
+
+    Temporary files left by a crashed ``_dump`` count as cache files, so they are evicted too.
+    """
+    entries = []
+    for pattern in (f"*{CACHE_SUFFIX}", f"*{CACHE_SUFFIX}.*.tmp"):
+        for cache_file in cache_dir.glob(pattern):
+            try:
+                stat = cache_file.stat()
+            except FileNotFoundError:
+                continue  # removed by another process since the glob
+            entries.append((stat.st_mtime, stat.st_size, cache_file))
+
+    total_size = sum(size for _, size, _ in entries)
+    for _, size, cache_file in sorted(entries):
+        if total_size <= max_size:
+            break
+        cache_file.unlink(missing_ok=True)
+        total_size -= size
+        logger.info(f"Evicted cached graph {cache_file.name}")
+
+
+def _cached(file_path: str | Path, kind: str, parse: Callable[[Path], Any], cache_dir: str | Path, max_size: int):
+    file_path = check_drawio_path(file_path)
+    cache_dir = Path(cache_dir)
+    cache_file = cache_dir / f"{_cache_key(file_path, kind)}{CACHE_SUFFIX}"
+
+    if cache_file.is_file():
+        try:
+            payload = _load(cache_file)
+        except (
+                OSError, EOFError, zlib.error, pickle.UnpicklingError, ValueError, AttributeError, ImportError,
+        ) as e:
+            # a pickle of an older version of the code may refer to classes or modules that moved
+            logger.warning(f"Ignoring unreadable cached graph {cache_file.name}: {e}")
+        else:
+            os.utime(cache_file)  # mark as recently used
+            logger.info(f"Loaded cached graph for '{file_path}'")
+            return payload
+
+    payload = parse(file_path)
+
+    # the cache is only an optimisation, failing to write it must not lose the parsed graph
+    try:
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        _dump(payload, cache_file)
+        _evict(cache_dir, max_size)
+    except OSError as e:
+        logger.warning(f"Could not store the cached graph {cache_file.name}: {e}")
+    return payload
+
+
+def cached_parse_drawio(
+        file_path: str | Path,
+        cache_dir: str | Path = DEFAULT_CACHE_DIR,
+        max_size: int = DEFAULT_MAX_CACHE_SIZE,
+        streaming: bool = True,
+        timings: dict[str, float] | None = None,
+) -> nx.DiGraph:
+    """
+    ``parse_drawio`` behind an on-disk cache keyed on the file content and the parser version.
+
+    Args:
+        file_path: Path to the .drawio file.
+        cache_dir: Directory holding the cached graphs.
+        max_size: Maximum total size of the cache in bytes, least recently used graphs are
+            evicted first.
+        streaming: Forwarded to ``parse_drawio`` on a cache miss.
+        timings: Forwarded to ``parse_drawio`` on a cache miss, left untouched on a hit.
+
+    Returns:
+        The same graph as ``parse_drawio(file_path)``.
+    """
+    payload = _cached(
+        file_path, "graph",
+        lambda path: _graph_to_payload(parse_drawio(path, streaming=streaming, timings=timings)),
+        cache_dir, max_size,
+    )
+    return _payload_to_graph(payload)
+
+
+def cached_parse_drawio_pages(
+        file_path: str | Path,
+        cache_dir: str | Path = DEFAULT_CACHE_DIR,
+        max_size: int = DEFAULT_MAX_CACHE_SIZE,
+        max_workers: int | None = None,
+        timings: dict[str, float] | None = None,
+) -> dict[str, nx.DiGraph]:
+    """``parse_drawio_pages`` behind the same cache as ``cached_parse_drawio``."""
+    payload = _cached(
+        file_path, "pages",
+        lambda path: [
+            (name, _graph_to_payload(graph))
+            for name, graph in parse_drawio_pages(path, max_workers=max_workers, timings=timings).items()
+        ],
+        cache_dir, max_size,
+    )
+    return {name: _payload_to_graph(graph) for name, graph in payload}
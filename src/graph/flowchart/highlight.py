@@ -7,7 +7,14 @@ HIGHLIGHT_EDGE_COLOR = "#FF0000"  # Red
 HIGHLIGHT_EDGE_WIDTH = "4"  # Increase stroke width
 
 
-def highlight_path_in_drawio(xml_file_path: str, paths: list[list]):
+def _find_diagram(root, page: str | None):
+    for diagram in root.iter("diagram"):
+        if page is None or page in (diagram.get("name"), diagram.get("id")):
+            return diagram
+    return None
+
+
+def highlight_path_in_drawio(xml_file_path: str, paths: list[list], page: str | None = None):
     """
     Modifies the .drawio XML file to highlight the given path by changing node and edge colors,
     and increasing stroke width.
@@ -15,13 +22,14 @@ def highlight_path_in_drawio(xml_file_path: str, paths: list[list]):
     Args:
         xml_file_path: Path to the .drawio XML file.
         path: List of node IDs representing the path to highlight.
+        page: Name or id of the page (``<diagram>``) holding the path, defaults to the first page.
         checked: If True, use the default highlight colors. If False, use the existing colors
                 or remove stroke if no existing color is found.
     """
     tree = ET.parse(xml_file_path)
     root = tree.getroot()
 
-    diagram = root.find(".//diagram")
+    diagram = _find_diagram(root, page)
     if diagram is None:
         print("No diagram found in the XML file.")
         return
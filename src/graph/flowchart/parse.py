@@ -1,13 +1,27 @@
+import base64
+import binascii
 import os
 import re
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain, islice
 from pathlib import Path
+from typing import Iterable, Iterator
+from urllib.parse import unquote_to_bytes
 import xml.etree.ElementTree as ET
 
 import networkx as nx
 from matplotlib import pyplot as plt
 
+from src.graph.csr import CSRGraph
 from src.graph.flowchart.display import InteractiveGraph
 
+# Bump whenever the graph built from a given file changes, this invalidates cached graphs
+PARSER_VERSION = 2
+
+_DECODE_CHUNK_SIZE = 64 * 1024  # multiple of 4 so that every chunk is valid base64
+
 
 def _clean_graph(G: nx.DiGraph) -> nx.DiGraph:
     G.remove_nodes_from(list(nx.isolates(G)))  # remove isolated nodes
@@ -32,34 +46,311 @@ def _parse_mxcell(cell):
     return id, label, parent, source, target
 
 
-def parse_drawio(file_path: str | Path) -> nx.DiGraph:
-    if not str(file_path).endswith(".drawio"):
-        raise ValueError("Invalid file extension. Expected .drawio")
-    # check if the file exists
-    file_path = Path(file_path)
-    if not file_path.is_file():
-        raise FileNotFoundError(f"File '{file_path}' not found")
+def _add_timing(timings: dict[str, float] | None, key: str, seconds: float):
+    if timings is not None:
+        timings[key] = timings.get(key, 0.0) + seconds
+
+
+def _is_compressed(diagram) -> bool:
+    # draw.io stores compressed pages as text instead of an <mxGraphModel> child
+    return len(diagram) == 0 and bool(diagram.text and diagram.text.strip())
+
+
+def _iter_decoded_diagram(diagram, timings: dict[str, float] | None = None) -> Iterator[bytes]:
+    """
+    Decode a compressed page (URL encoding, then raw deflate, then base64) chunk by chunk,
+    yielding the ``<mxGraphModel>`` XML. Time spent decoding is added to ``timings["decode"]``.
+    """
+    text = diagram.text.strip()
+    decompressor = zlib.decompressobj(-zlib.MAX_WBITS)
+    pending = b""  # a "%XX" escape may be split across two chunks
+
+    for i in range(0, len(text), _DECODE_CHUNK_SIZE):
+        start = time.perf_counter()
+        try:
+            data = pending + decompressor.decompress(base64.b64decode(text[i:i + _DECODE_CHUNK_SIZE]))
+        except (binascii.Error, zlib.error) as e:
+            raise ValueError(f"Invalid compressed diagram '{diagram.get('name')}': {e}") from e
+        split = data.rfind(b"%", max(len(data) - 2, 0))
+        if split == -1:
+            split = len(data)
+        pending = data[split:]
+        chunk = unquote_to_bytes(data[:split])
+        _add_timing(timings, "decode", time.perf_counter() - start)
+        yield chunk
+
+    start = time.perf_counter()
+    chunk = unquote_to_bytes(pending + decompressor.flush())
+    _add_timing(timings, "decode", time.perf_counter() - start)
+    yield chunk
+
+
+def _decode_diagram(diagram, timings: dict[str, float] | None = None):
+    parser = ET.XMLParser()
+    for chunk in _iter_decoded_diagram(diagram, timings):
+        parser.feed(chunk)
+    return parser.close()
+
+
+def _iter_decoded_events(diagram, timings: dict[str, float] | None = None):
+    parser = ET.XMLPullParser(events=("start", "end"))
+    for chunk in _iter_decoded_diagram(diagram, timings):
+        parser.feed(chunk)
+        yield from parser.read_events()
+    parser.close()
+    yield from parser.read_events()
 
-    tree = ET.parse(file_path)
-    root = tree.getroot()
 
+def _page_roots(root, timings: dict[str, float] | None = None) -> list:
+    diagrams = list(root.iter("diagram"))
+    if not diagrams:
+        return [root]
+    return [_decode_diagram(diagram, timings) if _is_compressed(diagram) else diagram for diagram in diagrams]
+
+
+def _records_from_tree(root, timings: dict[str, float] | None = None) -> tuple[list[tuple], list[tuple]]:
+    page_roots = _page_roots(root, timings)
+
+    user_objects = []
+    for page_root in page_roots:
+        for user_object in page_root.findall(".//UserObject"):
+            id, label = _parse_usergroup(user_object)
+            mx_cell = user_object.findall(".//mxCell")[0]
+            _, _, parent, _, _ = _parse_mxcell(mx_cell)
+            user_objects.append((id, label, parent))
+
+    cells = [_parse_mxcell(cell) for page_root in page_roots for cell in page_root.findall(".//mxCell")]
+    return user_objects, cells
+
+
+def _collect_stream_records(events: Iterable, user_objects: list, cells: list, timings: dict[str, float] | None):
+    open_user_objects = []  # UserObjects still waiting for their first mxCell
+    container = None
+    container_depth = -1
+    depth = 0
+
+    for event, elem in events:
+        if event == "start":
+            depth += 1
+            if elem.tag == "root":
+                container, container_depth = elem, depth
+            elif elem.tag == "UserObject":
+                id, label = _parse_usergroup(elem)
+                record = [id, label, None]
+                user_objects.append(record)
+                open_user_objects.append(record)
+            continue
+
+        if elem.tag == "mxCell":
+            cell = _parse_mxcell(elem)
+            cells.append(cell)
+            for record in open_user_objects:
+                record[2] = cell[2]
+            open_user_objects.clear()
+        elif elem.tag == "UserObject" and open_user_objects:
+            open_user_objects.pop()
+        elif elem.tag == "diagram" and _is_compressed(elem):
+            _collect_stream_records(_iter_decoded_events(elem, timings), user_objects, cells, timings)
+            elem.clear()
+
+        if depth == container_depth + 1:
+            container.clear()
+        depth -= 1
+
+
+def _records_from_stream(file_path: Path, timings: dict[str, float] | None = None) -> tuple[list[tuple], list[tuple]]:
+    """
+    Single pass over the file with ``iterparse``, yielding the same records as
+    ``_records_from_tree``. Cells are cleared from their ``<root>`` container as soon
+    as they have been handled so the XML tree never grows past one cell. Compressed
+    pages are decoded and parsed incrementally as well.
+    """
+    user_objects = []
+    cells = []
+    _collect_stream_records(ET.iterparse(file_path, events=("start", "end")), user_objects, cells, timings)
+    return [tuple(record) for record in user_objects], cells
+
+
+def _build_graph(user_objects: list[tuple], cells: list[tuple]) -> nx.DiGraph:
     G = nx.DiGraph()
 
-    for user_object in root.findall(".//UserObject"):
-        id, label = _parse_usergroup(user_object)
-        mx_cell = user_object.findall(".//mxCell")[0]
-        _, _, parent, _, _ = _parse_mxcell(mx_cell)
+    for id, label, parent in user_objects:
         if parent and id and id not in G.nodes:
             G.add_node(id, label=label)
 
-    for cell in root.findall(".//mxCell"):
-        id, label, parent, source, target = _parse_mxcell(cell)
+    for id, label, parent, source, target in cells:
         if source and target:
             G.add_edge(source, target, label=label)
         elif parent and id:
             G.add_node(id, label=label)
     return _clean_graph(G)
 
+
+def _build_csr(user_objects: list[tuple], cells: list[tuple]) -> CSRGraph:
+    """Same graph as ``_build_graph``, without going through networkx."""
+    labels = {}  # node id -> label, in the order the DiGraph would add them
+    for id, label, parent in user_objects:
+        if parent and id and id not in labels:
+            labels[id] = label
+
+    edges = {}  # (source, target) -> label, a repeated edge keeps its position
+    for id, label, parent, source, target in cells:
+        if source and target:
+            labels.setdefault(source, None)
+            labels.setdefault(target, None)
+            edges[(source, target)] = label
+        elif parent and id:
+            labels[id] = label
+
+    # remove isolated nodes
+    connected = {node for edge in edges for node in edge}
+    ids = [id for id in labels if id in connected]
+    index = {id: i for i, id in enumerate(ids)}
+    return CSRGraph.from_edges(
+        ids,
+        ((index[source], index[target]) for source, target in edges),
+        [labels[id] for id in ids],
+        list(edges.values()),
+    )
+
+
+def check_drawio_path(file_path: str | Path) -> Path:
+    if not str(file_path).endswith(".drawio"):
+        raise ValueError("Invalid file extension. Expected .drawio")
+    # check if the file exists
+    file_path = Path(file_path)
+    if not file_path.is_file():
+        raise FileNotFoundError(f"File '{file_path}' not found")
+    return file_path
+
+
+def parse_drawio(
+        file_path: str | Path,
+        streaming: bool = False,
+        timings: dict[str, float] | None = None,
+) -> nx.DiGraph:
+    """
+    Build the flowchart graph of a .drawio file. Compressed pages are decoded transparently.
+
+    Args:
+        file_path: Path to the .drawio file.
+        streaming: If True, read the file in a single ``iterparse`` pass and free each
+            cell once handled instead of loading the whole document. The resulting graph
+            is identical.
+        timings: If given, receives the seconds spent decoding compressed pages under
+            ``"decode"`` and the total parsing time under ``"parse"``.
+
+    Returns:
+        A directed graph whose nodes carry a ``label`` attribute, as do its edges.
+    """
+    file_path = check_drawio_path(file_path)
+    start = time.perf_counter()
+
+    if streaming:
+        user_objects, cells = _records_from_stream(file_path, timings)
+    else:
+        root = ET.parse(file_path).getroot()
+        user_objects, cells = _records_from_tree(root, timings)
+
+    G = _build_graph(user_objects, cells)
+    _add_timing(timings, "parse", time.perf_counter() - start)
+    return G
+
+
+def parse_drawio_csr(
+        file_path: str | Path,
+        streaming: bool = False,
+        timings: dict[str, float] | None = None,
+) -> CSRGraph:
+    """
+    Same as ``parse_drawio`` but builds the integer indexed ``CSRGraph`` directly, use
+    ``CSRGraph.to_networkx`` to display it.
+    """
+    file_path = check_drawio_path(file_path)
+    start = time.perf_counter()
+
+    if streaming:
+        user_objects, cells = _records_from_stream(file_path, timings)
+    else:
+        root = ET.parse(file_path).getroot()
+        user_objects, cells = _records_from_tree(root, timings)
+
+    G = _build_csr(user_objects, cells)
+    _add_timing(timings, "parse", time.perf_counter() - start)
+    return G
+
+
+def _parse_page(page_xml: bytes) -> tuple[nx.DiGraph, dict[str, float]]:
+    timings = {}
+    start = time.perf_counter()
+    G = _build_graph(*_records_from_tree(ET.fromstring(page_xml), timings))
+    _add_timing(timings, "parse", time.perf_counter() - start)
+    return G, timings
+
+
+def _iter_pages(file_path: Path):
+    """
+    Yield ``(page_name, page_id, page_xml)`` for every ``<diagram>`` of the file, streaming
+    over the document so that only one page is held in memory at a time. A file without any
+    ``<diagram>`` is returned as a single page named after the file.
+    """
+    has_pages = False
+    elem = None
+    for _, elem in ET.iterparse(file_path, events=("end",)):
+        if elem.tag == "diagram":
+            has_pages = True
+            yield elem.get("name") or elem.get("id"), elem.get("id"), ET.tostring(elem)
+            elem.clear()
+
+    if not has_pages and elem is not None:
+        yield file_path.stem, None, ET.tostring(elem)  # last element is the document root
+
+
+def parse_drawio_pages(
+        file_path: str | Path,
+        max_workers: int | None = None,
+        timings: dict[str, float] | None = None,
+) -> dict[str, nx.DiGraph]:
+    """
+    Build one flowchart graph per page (``<diagram>``) of a .drawio file.
+
+    Pages are built in a process pool when there is more than one of them. Compressed pages
+    are decoded in the worker that builds them.
+
+    Args:
+        file_path: Path to the .drawio file.
+        max_workers: Maximum number of worker processes, 1 builds the pages in the current
+            process.
+        timings: If given, receives the seconds spent decoding compressed pages under
+            ``"decode"`` and building the graphs under ``"parse"``, summed over the pages.
+
+    Returns:
+        The graphs keyed by page name, in document order. A name used by several pages is
+        suffixed with the page id.
+    """
+    file_path = check_drawio_path(file_path)
+
+    pages = _iter_pages(file_path)
+    first_pages = list(islice(pages, 2))
+    if len(first_pages) < 2 or max_workers == 1:
+        graphs = [(name, id, _parse_page(page_xml)) for name, id, page_xml in chain(first_pages, pages)]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            futures = [
+                (name, id, executor.submit(_parse_page, page_xml))
+                for name, id, page_xml in chain(first_pages, pages)
+            ]
+            graphs = [(name, id, future.result()) for name, id, future in futures]
+
+    result = {}
+    for name, id, (graph, page_timings) in graphs:
+        for key, seconds in page_timings.items():
+            _add_timing(timings, key, seconds)
+        if name in result:
+            name = f"{name} ({id})"
+        result[name] = graph
+    return result
+
 if __name__ == "__main__":
     file_path = Path(r"/drawio_examples/testChartwithLoop.drawio")
     graph = parse_drawio(file_path)
@@ -0,0 +1,229 @@
+from dataclasses import dataclass, field
+from typing import Hashable
+
+import networkx as nx
+
+from src.graph.csr import CSRGraph
+
+
+@dataclass
+class Loop:
+    """
+    A loop of the flowchart, known by its header: the first of its nodes reached from start.
+
+    Attributes:
+        header: The node every iteration of the loop goes back to.
+        nodes: The nodes of the loop, nested loops included.
+        back_edges: The edges going back to the header from inside the loop.
+        parent: The id of the innermost loop containing this one, None for an outermost loop.
+        children: The ids of the loops directly nested in this one.
+        reducible: False when the loop can be entered without going through its header, it
+            is then not a natural loop.
+    """
+    header: Hashable
+    nodes: set = field(default_factory=set)
+    back_edges: list[tuple[Hashable, Hashable]] = field(default_factory=list)
+    parent: int | None = None
+    children: list[int] = field(default_factory=list)
+    reducible: bool = True
+
+
+@dataclass
+class LoopNestingForest:
+    """
+    The loops of a graph and how they nest, a loop's id is its position in ``loops``.
+
+    Attributes:
+        loops: The loops, outer loops before the loops they contain.
+        roots: The ids of the outermost loops.
+        loop_of: Maps every node in a loop to the id of the innermost loop containing it.
+        dominators: Maps every node reachable from start to its immediate dominator, start
+            is its own dominator.
+    """
+    loops: list[Loop]
+    roots: list[int]
+    loop_of: dict[Hashable, int]
+    dominators: dict[Hashable, Hashable]
+
+
+def _depth_first_order(adjacency: list[list[int]], start: int) -> tuple[list[int], list[int]]:
+    """
+    Number the nodes reachable from start in depth first preorder.
+
+    Returns:
+        The nodes in preorder and, for each of them, the last preorder number of its subtree,
+        so that w is an ancestor of v when ``pre[w] <= pre[v] <= last[pre[w]]``
+    """
+    pre = [-1] * len(adjacency)
+    order = [start]
+    pre[start] = 0
+    last = [0]
+    stack = [(start, iter(adjacency[start]))]
+    while stack:
+        node, successors = stack[-1]
+        for successor in successors:
+            if pre[successor] == -1:
+                pre[successor] = len(order)
+                order.append(successor)
+                last.append(0)
+                stack.append((successor, iter(adjacency[successor])))
+                break
+        else:
+            stack.pop()
+            last[pre[node]] = len(order) - 1
+    return order, last
+
+
+def _immediate_dominators(predecessors: list[list[int]], order: list[int], pre: list[int]) -> list[int]:
+    """
+    Cooper, Harvey and Kennedy's iterative dominator algorithm ("A Simple, Fast Dominance
+    Algorithm", 2001), on the preorder numbers. Returns the immediate dominator of each preorder number.
+    """
+    # reverse postorder is needed for the fixed point to converge fast, a preorder works as
+    # well for correctness and is already at hand
+    idom = [-1] * len(order)
+    idom[0] = 0
+
+    def intersect(a: int, b: int) -> int:
+        while a != b:
+            while a > b:
+                a = idom[a]
+            while b > a:
+                b = idom[b]
+        return a
+
+    changed = True
+    while changed:
+        changed = False
+        for number in range(1, len(order)):
+            new_idom = -1
+            for predecessor in predecessors[order[number]]:
+                p = pre[predecessor]
+                if p == -1 or idom[p] == -1:
+                    continue
+                new_idom = p if new_idom == -1 else intersect(p, new_idom)
+            if idom[number] != new_idom:
+                idom[number] = new_idom
+                changed = True
+    return idom
+
+
+def find_loop_nesting_forest(graph: nx.DiGraph | CSRGraph, start: str) -> LoopNestingForest:
+    """
+    Find the loops of the graph and how they nest, without enumerating its cycles.
+
+    Loops are found with Havlak's algorithm ("Nesting of Reducible and Irreducible Loops",
+    1997): the nodes are visited in reverse depth first preorder, the nodes reaching a back
+    edge of a header form its loop and are merged into the header with a union-find, so
+    that outer loops walk over each nested loop as a single node. Irreducible loops, entered
+    from outside without going through their header, are kept and flagged. The dominator
+    tree is built with Cooper, Harvey and Kennedy's algorithm.
+
+    Only the nodes reachable from start are considered.
+
+    Args:
+        graph: The directed graph, a networkx graph is converted to a CSRGraph first
+        start: The starting node
+
+    Returns:
+        The loop nesting forest of the graph
+    """
+    if not isinstance(graph, CSRGraph):
+        graph = CSRGraph.from_networkx(graph)
+    adjacency = graph.adjacency()
+    order, last = _depth_first_order(adjacency, graph.index[start])
+    pre = [-1] * len(adjacency)
+    for number, node in enumerate(order):
+        pre[node] = number
+
+    # everything below runs on preorder numbers
+    predecessors = [[] for _ in adjacency]
+    for node, successors in enumerate(adjacency):
+        if pre[node] != -1:
+            for successor in successors:
+                predecessors[successor].append(node)
+    back_predecessors = [[] for _ in order]
+    other_predecessors = [[] for _ in order]
+    for w, node in enumerate(order):
+        for predecessor in predecessors[node]:
+            v = pre[predecessor]
+            (back_predecessors if w <= v <= last[w] else other_predecessors)[w].append(v)
+
+    union_find = list(range(len(order)))
+
+    def find(x: int) -> int:
+        root = x
+        while union_find[root] != root:
+            root = union_find[root]
+        while union_find[x] != root:
+            union_find[x], x = root, union_find[x]
+        return root
+
+    header_of = [-1] * len(order)  # innermost loop header of every node
+    irreducible = set()
+    for w in reversed(range(len(order))):
+        body = set()
+        for v in back_predecessors[w]:
+            if v != w:
+                body.add(find(v))
+        worklist = list(body)
+        while worklist:
+            x = worklist.pop()
+            for y in other_predecessors[x]:
+                y = find(y)
+                if not w <= y <= last[w]:
+                    # entered from outside without going through w
+                    irreducible.add(w)
+                    other_predecessors[w].append(y)
+                elif y not in body and y != w:
+                    body.add(y)
+                    worklist.append(y)
+        for x in body:
+            header_of[x] = w
+            union_find[x] = w
+
+    # a node is a header when it has a back edge, headers are in preorder so outer loops come first
+    ids = graph.ids
+    loop_id = {}
+    loops = []
+    for w in range(len(order)):
+        if back_predecessors[w]:
+            loop_id[w] = len(loops)
+            loops.append(Loop(
+                ids[order[w]],
+                back_edges=[(ids[order[v]], ids[order[w]]) for v in back_predecessors[w]],
+                reducible=w not in irreducible,
+            ))
+
+    def enclosing_loop(number: int) -> int | None:
+        header = header_of[number]
+        while header != -1 and header not in loop_id:
+            header = header_of[header]
+        return loop_id.get(header)
+
+    roots = []
+    for w, id in loop_id.items():
+        parent = enclosing_loop(w)
+        loops[id].parent = parent
+        if parent is None:
+            roots.append(id)
+        else:
+            loops[parent].children.append(id)
+
+    loop_of = {}
+    for number, node in enumerate(order):
+        id = loop_id[number] if number in loop_id else enclosing_loop(number)
+        if id is not None:
+            loop_of[ids[node]] = id
+    # a loop holds its own nodes and, through its children, their nodes; inner loops come last
+    for id, loop in enumerate(loops):
+        loop.nodes.add(loop.header)
+    for node, id in loop_of.items():
+        loops[id].nodes.add(node)
+    for id in reversed(range(len(loops))):
+        if loops[id].parent is not None:
+            loops[loops[id].parent].nodes |= loops[id].nodes
+
+    idom = _immediate_dominators(predecessors, order, pre)
+    dominators = {ids[order[number]]: ids[order[d]] for number, d in enumerate(idom)}
+    return LoopNestingForest(loops, roots, loop_of, dominators)
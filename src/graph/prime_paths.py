@@ -0,0 +1,185 @@
+from collections import deque
+
+import networkx as nx
+
+from src.graph.csr import CSRGraph
+from src.graph.find_covering_paths import CoverageStats
+from src.graph.set_cover import lazy_greedy_cover
+
+# coverage criterion asking every prime path to be toured, see find_prime_paths
+PRIME_PATH = "prime_path"
+
+
+def find_prime_paths(graph: nx.DiGraph | CSRGraph) -> list[list]:
+    """
+    Find the prime paths of the graph: the simple paths, or simple cycles, that are not a
+    proper subpath of another simple path or cycle.
+
+    Prime paths are found by extending paths one node at a time from every node (Ammann and
+    Offutt, "Introduction to Software Testing", 2nd edition, section 7.2.1), depth first on
+    the node numbers with the nodes of the path in an int bitmask. Rather than comparing
+    every pair of paths, a path is kept when it cannot be extended at either end: a cycle,
+    or a path whose last node only leads back into it and whose first node is only reached
+    from it. Except for cycles, a prime path holds every predecessor of its first node, so a
+    path leaving the strongly connected component of its first node without them is not
+    extended, they cannot be reached any more. From a node entered from another component,
+    only its cycles are searched.
+
+    Args:
+        graph: The directed graph, a networkx graph is converted to a CSRGraph first
+
+    Returns:
+        The prime paths, where each path is a list of nodes, a cycle ending with its first node
+    """
+    if not isinstance(graph, CSRGraph):
+        graph = CSRGraph.from_networkx(graph)
+    adjacency = graph.adjacency()
+    predecessors = [[] for _ in adjacency]
+    for node, successors in enumerate(adjacency):
+        for successor in successors:
+            predecessors[successor].append(node)
+    _, component = graph.strongly_connected_components()
+
+    prime_paths = []
+    for first in range(len(adjacency)):
+        first_predecessors = 0
+        for u in predecessors[first]:
+            first_predecessors |= 1 << u
+
+        path = [first]
+        mask = 1 << first
+        stack = [iter(adjacency[first])]
+        extended = [False]  # whether each path on the stack could be extended
+        while stack:
+            for successor in stack[-1]:
+                if successor == first:
+                    prime_paths.append(path + [first])
+                    extended[-1] = True
+                elif not mask >> successor & 1:
+                    extended[-1] = True
+                    if component[successor] != component[first] and first_predecessors & ~mask:
+                        # the missing predecessors cannot be reached any more
+                        continue
+                    path.append(successor)
+                    mask |= 1 << successor
+                    stack.append(iter(adjacency[successor]))
+                    extended.append(False)
+                    break
+            else:
+                stack.pop()
+                if not extended.pop() and not first_predecessors & ~mask:
+                    prime_paths.append(list(path))
+                mask &= ~(1 << path.pop())
+
+    ids = graph.ids
+    return [[ids[node] for node in path] for path in prime_paths]
+
+
+def find_edge_pairs(graph: nx.DiGraph | CSRGraph) -> list[list]:
+    """The pairs of successive edges of the graph, as paths of three nodes."""
+    if not isinstance(graph, CSRGraph):
+        graph = CSRGraph.from_networkx(graph)
+    adjacency = graph.adjacency()
+    ids = graph.ids
+    return [
+        [ids[u], ids[v], ids[w]]
+        for u, successors in enumerate(adjacency) for v in successors for w in adjacency[v]
+    ]
+
+
+def tour_requirements(
+        graph: nx.DiGraph | CSRGraph,
+        start: str,
+        end: str | list[str],
+        requirements: list[list],
+        coverage: CoverageStats | None = None,
+) -> list[list[str]]:
+    """
+    Find test paths from start to an end node touring the requirements, such as prime paths
+    or edge pairs: each requirement is a subpath of one of the test paths.
+
+    Every requirement gets a candidate test path, the shortest path from start to its first
+    node, the requirement, then the shortest path from its last node to an end node. The
+    test paths are picked among the candidates by lazy greedy set cover on the requirements
+    they tour. Requirements out of reach of start or of the end nodes are left uncovered.
+
+    Args:
+        graph: The directed graph, a networkx graph is converted to a CSRGraph first
+        start: The starting node
+        end: The ending nodes
+        requirements: The paths to tour, each a list of nodes
+        coverage: If given, receives the number of requirements and of toured requirements
+
+    Returns:
+        The test paths, in the order they were picked
+    """
+    if not isinstance(end, list):
+        end = [end]
+    if not isinstance(graph, CSRGraph):
+        graph = CSRGraph.from_networkx(graph)
+    if coverage is None:
+        coverage = CoverageStats()
+    adjacency = graph.adjacency()
+    index = graph.index
+
+    # shortest path trees, from start and towards the end nodes
+    parent = [-1] * len(adjacency)
+    parent[index[start]] = index[start]
+    queue = deque([index[start]])
+    while queue:
+        node = queue.popleft()
+        for successor in adjacency[node]:
+            if parent[successor] == -1:
+                parent[successor] = node
+                queue.append(successor)
+    predecessors = [[] for _ in adjacency]
+    for node, successors in enumerate(adjacency):
+        for successor in successors:
+            predecessors[successor].append(node)
+    next_node = [-1] * len(adjacency)
+    queue = deque()
+    for node in end:
+        next_node[index[node]] = index[node]
+        queue.append(index[node])
+    while queue:
+        node = queue.popleft()
+        for predecessor in predecessors[node]:
+            if next_node[predecessor] == -1:
+                next_node[predecessor] = node
+                queue.append(predecessor)
+
+    requirements = [tuple(index[node] for node in requirement) for requirement in requirements]
+    by_first_node = {}
+    for i, requirement in enumerate(requirements):
+        by_first_node.setdefault(requirement[0], []).append(i)
+
+    candidates = []
+    bitsets = []
+    for requirement in dict.fromkeys(requirements):
+        if parent[requirement[0]] == -1 or next_node[requirement[-1]] == -1:
+            continue
+        head = [requirement[0]]
+        while head[-1] != parent[head[-1]]:
+            head.append(parent[head[-1]])
+        tail = [requirement[-1]]
+        while tail[-1] != next_node[tail[-1]]:
+            tail.append(next_node[tail[-1]])
+        candidate = head[:0:-1] + list(requirement) + tail[1:]
+
+        # the requirements toured by the candidate, its own requirement among them
+        bitset = 0
+        for position, node in enumerate(candidate):
+            for i in by_first_node.get(node, ()):
+                if tuple(candidate[position:position + len(requirements[i])]) == requirements[i]:
+                    bitset |= 1 << i
+        candidates.append(candidate)
+        bitsets.append(bitset)
+
+    cover = lazy_greedy_cover(bitsets)
+    toured = 0
+    for i in cover:
+        toured |= bitsets[i]
+    coverage.requirements = len(requirements)
+    coverage.covered = toured.bit_count()
+    ids = graph.ids
+    return [[ids[node] for node in candidates[i]] for i in cover]
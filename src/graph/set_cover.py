@@ -0,0 +1,31 @@
+import heapq
+
+
+def lazy_greedy_cover(bitsets: list[int]) -> list[int]:
+    """
+    Greedy set cover with lazy evaluation of the gains (CELF, Leskovec et al., "Cost-effective
+    Outbreak Detection in Networks", 2007).
+
+    The gain of a set only decreases as the cover grows, so the gain in the heap is an upper
+    bound and a set is only evaluated again when it reaches the top of the heap. A set whose
+    fresh gain is still the best is picked, ties going to the first set, so the cover is the
+    one of the plain greedy algorithm.
+
+    Returns:
+        The positions of the picked sets, in the order they were picked
+    """
+    heap = [(-bitset.bit_count(), i) for i, bitset in enumerate(bitsets)]
+    heapq.heapify(heap)
+    covered = 0
+    cover = []
+    while heap:
+        _, i = heapq.heappop(heap)
+        gain = (bitsets[i] & ~covered).bit_count()
+        if gain == 0:
+            continue
+        if heap and (-gain, i) > heap[0]:
+            heapq.heappush(heap, (-gain, i))
+            continue
+        cover.append(i)
+        covered |= bitsets[i]
+    return cover
@@ -0,0 +1,43 @@
+# Compare the cycle search backends of find_cycles on every page of the drawio_examples files.
+# Run from the repository root: python -m src.graph.testing.benchmark_cycles
+
+import logging
+import time
+from pathlib import Path
+
+from src.graph.csr import CSRGraph
+from src.graph.find_cycles import find_cycles
+from src.graph.flowchart.parse import parse_drawio_pages
+
+EXAMPLE_FOLDER = Path(__file__).parents[3] / "drawio_examples"
+
+
+def canonical(cycle: list) -> tuple:
+    # the same cycle may start at any of its nodes
+    first = cycle.index(min(cycle))
+    return tuple(cycle[first:] + cycle[:first])
+
+
+def benchmark(repeat: int = 5):
+    for file_path in sorted(EXAMPLE_FOLDER.glob("*.drawio")):
+        graphs = [CSRGraph.from_networkx(graph) for graph in parse_drawio_pages(file_path, max_workers=1).values()]
+        times = {}
+        cycle_sets = {}
+        for backend in ("networkx", "johnson"):
+            start = time.perf_counter()
+            for _ in range(repeat):
+                cycles = [find_cycles(graph, backend=backend) for graph in graphs]
+            times[backend] = (time.perf_counter() - start) / repeat
+            cycle_sets[backend] = [sorted(map(canonical, page_cycles)) for page_cycles in cycles]
+
+        nb_cycles = sum(map(len, cycle_sets["johnson"]))
+        same = "same cycles" if cycle_sets["networkx"] == cycle_sets["johnson"] else "DIFFERENT CYCLES"
+        print(
+            f"{file_path.name}: {nb_cycles} cycles, networkx {times['networkx'] * 1000:.2f} ms, "
+            f"johnson {times['johnson'] * 1000:.2f} ms ({times['networkx'] / times['johnson']:.1f}x), {same}"
+        )
+
+
+if __name__ == "__main__":
+    logging.disable(logging.INFO)
+    benchmark()
@@ -1,13 +1,15 @@
 import networkx as nx
 import pytest
 
-from src.graph.flowchart.parse import parse_drawio
+from src.graph.flowchart.parse import parse_drawio, parse_drawio_pages, parse_drawio_csr
 
 
 DRAWIO_NO_MXCELL_NO_USEROBJECT = r"xml_testing_files/no_mxcell_userobject.drawio"
 DRAWIO_MXCELL_NO_USEROBJECT_ISOLATE_NODE = r"xml_testing_files/mxcell_no_userobject_isolate.drawio"
 DRAWIO_MXCELL_NO_USEROBJECT_NO_ISOLATE_NODE = r"xml_testing_files/mxcell_no_userobject_no_isolate.drawio"
 DRAWIO_MXCELL_USEROBJECT_NO_ISOLATE_NODE = r"xml_testing_files/mxcell_userobject_no_isolate.drawio"
+DRAWIO_MULTI_PAGE = r"xml_testing_files/multi_page.drawio"
+DRAWIO_COMPRESSED_MXCELL_USEROBJECT_NO_ISOLATE_NODE = r"xml_testing_files/compressed_userobject_no_isolate.drawio"
 
 TXT_FILE_PATH = r"E:\stage\sujet\python\src\graph\tests\xml_testing_files\test.txt"
 
@@ -79,4 +81,84 @@ def test_drawiofile_mxCell_UserObject_no_isolate_node__return_two_node_one_edge_
     assert len(graph.edges) == 1
     assert graph.has_edge("node-1", "node-2")
     assert graph.nodes["node-1"]["label"] == "1"
-    assert graph.nodes["node-2"]["label"] == "2"
\ No newline at end of file
+    assert graph.nodes["node-2"]["label"] == "2"
+
+@pytest.mark.parametrize("file_path", [
+    DRAWIO_NO_MXCELL_NO_USEROBJECT,
+    DRAWIO_MXCELL_NO_USEROBJECT_ISOLATE_NODE,
+    DRAWIO_MXCELL_NO_USEROBJECT_NO_ISOLATE_NODE,
+    DRAWIO_MXCELL_USEROBJECT_NO_ISOLATE_NODE,
+])
+def test_drawiofile_streaming__return_same_graph_as_tree_parsing(file_path):
+    # Act
+    graph: nx.DiGraph = parse_drawio(file_path)
+    streamed_graph: nx.DiGraph = parse_drawio(file_path, streaming=True)
+
+    # Assert
+    assert list(streamed_graph.nodes(data=True)) == list(graph.nodes(data=True))
+    assert list(streamed_graph.edges(data=True)) == list(graph.edges(data=True))
+
+
+@pytest.mark.parametrize("max_workers", [1, 2])
+def test_drawiofile_multi_page__return_one_graph_per_page(max_workers):
+    # Act
+    pages: dict[str, nx.DiGraph] = parse_drawio_pages(DRAWIO_MULTI_PAGE, max_workers=max_workers)
+
+    # Assert
+    assert list(pages) == ["Page-1", "Page-2"]
+    assert list(pages["Page-1"].edges) == [("node-1", "node-2")]
+    assert list(pages["Page-2"].edges) == [("node-1", "node-3")]
+    assert pages["Page-2"].nodes["node-3"]["label"] == "3"
+
+
+def test_drawiofile_single_page__return_same_graph_as_parse_drawio():
+    # Act
+    pages: dict[str, nx.DiGraph] = parse_drawio_pages(DRAWIO_MXCELL_USEROBJECT_NO_ISOLATE_NODE)
+
+    # Assert
+    graph = parse_drawio(DRAWIO_MXCELL_USEROBJECT_NO_ISOLATE_NODE)
+    assert list(pages) == ["Page-1"]
+    assert list(pages["Page-1"].nodes(data=True)) == list(graph.nodes(data=True))
+    assert list(pages["Page-1"].edges(data=True)) == list(graph.edges(data=True))
+
+
+@pytest.mark.parametrize("streaming", [False, True])
+def test_drawiofile_compressed__return_same_graph_as_uncompressed(streaming, mocker):
+    # Arrange
+    mocker.patch("src.graph.flowchart.parse._DECODE_CHUNK_SIZE", 8)  # split the payload in many chunks
+    timings = {}
+
+    # Act
+    graph: nx.DiGraph = parse_drawio(DRAWIO_COMPRESSED_MXCELL_USEROBJECT_NO_ISOLATE_NODE, streaming, timings)
+
+    # Assert
+    expected = parse_drawio(DRAWIO_MXCELL_USEROBJECT_NO_ISOLATE_NODE)
+    assert list(graph.nodes(data=True)) == list(expected.nodes(data=True))
+    assert list(graph.edges(data=True)) == list(expected.edges(data=True))
+    assert 0 < timings["decode"] <= timings["parse"]
+
+
+def test_drawiofile_compressed_page__return_same_graph_as_uncompressed():
+    # Act
+    pages: dict[str, nx.DiGraph] = parse_drawio_pages(DRAWIO_COMPRESSED_MXCELL_USEROBJECT_NO_ISOLATE_NODE)
+
+    # Assert
+    expected = parse_drawio(DRAWIO_MXCELL_USEROBJECT_NO_ISOLATE_NODE)
+    assert list(pages["Page-1"].nodes(data=True)) == list(expected.nodes(data=True))
+    assert list(pages["Page-1"].edges(data=True)) == list(expected.edges(data=True))
+
+
+@pytest.mark.parametrize("file_path", [
+    DRAWIO_NO_MXCELL_NO_USEROBJECT,
+    DRAWIO_MXCELL_NO_USEROBJECT_NO_ISOLATE_NODE,
+    DRAWIO_MXCELL_USEROBJECT_NO_ISOLATE_NODE,
+])
+def test_drawiofile_csr__return_same_graph_as_networkx(file_path):
+    # Act
+    csr_graph = parse_drawio_csr(file_path)
+
+    # Assert
+    graph = parse_drawio(file_path)
+    assert csr_graph.ids == list(graph.nodes)
+    assert csr_graph.labels == [label for _, label in graph.nodes(data="label")]
+    assert list(csr_graph.to_networkx().edges(data=True)) == list(graph.edges(data=True))
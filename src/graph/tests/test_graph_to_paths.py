@@ -3,9 +3,25 @@ from unittest.mock import patch
 import pytest
 import networkx as nx
 
-from src.graph.find_cycles import find_cycles
-from src.graph.find_path_with_cycles import find_paths_with_cycles
+from src.graph.compress_chains import compress_chains, expand_path
+from src.graph.csr import CSRGraph
+from src.graph.cycle_index import CycleIndex
+from src.graph.cyclomatic import compute_cyclomatic_number
+from src.graph.find_covering_paths import cover_paths_with_cycles, find_covering_paths, CoverageStats, LOOP
+from src.graph.find_cycles import find_cycles, iter_cycles, CycleSearchStats, MAX_CYCLE_LENGTH, MAX_CYCLES
+from src.graph import find_minimal_paths
+from src.graph.find_minimal_paths import (
+    greedy_path_cover, minimum_path_cover_ilp, _requirements, EDGE, EDGE_PAIR, GREEDY, NODE, OPTIMAL,
+)
+from src.graph.find_path_with_cycles import (
+    count_paths_with_cycles, find_paths_with_cycles, find_paths_with_cycles_parallel, iter_paths_with_cycles,
+    PathSearchBudget, PathSearchStats, PathStates,
+    MAX_EXPANDED, MAX_PATH_LENGTH, MAX_PATHS, TIMEOUT,
+)
 from src.graph.find_start_end_node import find_start_end_nodes
+from src.graph.loop_nesting_forest import find_loop_nesting_forest
+from src.graph.prime_paths import find_edge_pairs, find_prime_paths, tour_requirements, PRIME_PATH
+from src.main import analyse_page
 
 
 def _execute_paths_finder(G):
@@ -64,4 +80,839 @@ def test_graph_one_cycle__return_two_paths():
     # Assert
     assert ["A", "B", "C", "D"] in paths
     assert ["A", "B", "C", "B", "C", "D"] in paths
-    assert len(paths) == 2
\ No newline at end of file
+    assert len(paths) == 2
+
+
+def test_csr_graph_one_cycle__return_same_paths_as_networkx():
+    # Arrange
+    G = nx.DiGraph()
+    G.add_edges_from([('A', 'B'), ('B', 'C'), ('C', 'D'), ('C', 'B'), ('B', 'E'), ('E', 'D')])
+    csr_graph = CSRGraph.from_networkx(G)
+
+    # Act
+    paths = _execute_paths_finder(csr_graph)
+
+    # Assert
+    assert paths == _execute_paths_finder(G)
+    assert [set(cycle) for cycle in find_cycles(csr_graph)] == [set(cycle) for cycle in find_cycles(G)]
+    assert compute_cyclomatic_number(csr_graph) == compute_cyclomatic_number(G)
+
+
+def test_csr_graph__convert_back_to_same_networkx_graph():
+    # Arrange
+    G = nx.DiGraph()
+    G.add_node("A", label="start")
+    G.add_node("B", label="end")
+    G.add_edge("B", "A", label="no")
+    G.add_edge("A", "B", label="yes")
+
+    # Act
+    csr_graph = CSRGraph.from_networkx(G)
+
+    # Assert
+    assert csr_graph.ids == ["A", "B"]
+    assert csr_graph.adjacency() == [[1], [0]]
+    assert list(csr_graph.to_networkx().nodes(data=True)) == list(G.nodes(data=True))
+    assert list(csr_graph.to_networkx().edges(data=True)) == list(G.edges(data=True))
+
+
+def test_graph_two_cycles_sharing_node__use_each_loop_once():
+    # Arrange
+    G = nx.DiGraph()
+    G.add_edges_from([('0', '4'), ('4', '3'), ('3', '1'), ('1', '3'), ('3', '4'), ('4', '5')])
+
+    # Act
+    paths = _execute_paths_finder(G)
+
+    # Assert
+    assert paths == [
+        ['0', '4', '5'],
+        ['0', '4', '3', '4', '5'],
+        ['0', '4', '3', '4', '3', '1', '3', '4', '5'],
+        ['0', '4', '3', '1', '3', '4', '5'],
+        ['0', '4', '3', '1', '3', '4', '3', '4', '5'],
+    ]
+
+
+def test_graph_one_cycle__report_no_duplicate_path():
+    # Arrange
+    G = nx.DiGraph()
+    G.add_edges_from([('A', 'B'), ('B', 'C'), ('C', 'D'), ('C', 'B')])
+    stats = PathSearchStats()
+
+    # Act
+    paths = find_paths_with_cycles(G, 'A', ['D'], find_cycles(G), stats=stats)
+
+    # Assert
+    assert len(paths) == len(set(map(tuple, paths))) == 2
+    assert stats.duplicates == 0
+
+
+def test_iter_paths_one_cycle__yield_paths_lazily_in_same_order():
+    # Arrange
+    G = nx.DiGraph()
+    G.add_edges_from([('A', 'B'), ('B', 'C'), ('C', 'D'), ('C', 'B'), ('B', 'E'), ('E', 'D')])
+    cycles = find_cycles(G)
+
+    # Act
+    paths = iter_paths_with_cycles(G, 'A', ['D'], cycles)
+
+    # Assert
+    assert next(paths) == find_paths_with_cycles(G, 'A', ['D'], cycles)[0]
+    assert [next(paths)] + list(paths) == find_paths_with_cycles(G, 'A', ['D'], cycles)[1:]
+
+
+def test_count_paths_two_cycles_two_ends__match_enumeration():
+    # Arrange
+    G = nx.DiGraph()
+    G.add_edges_from([
+        ('0', '4'), ('4', '3'), ('3', '1'), ('1', '3'), ('3', '4'), ('4', '5'), ('1', '6'),
+    ])
+    cycles = find_cycles(G)
+    paths = find_paths_with_cycles(G, '0', ['5', '6'], cycles)
+
+    # Act
+    counts = count_paths_with_cycles(G, '0', ['5', '6'], cycles)
+
+    # Assert
+    assert counts == {
+        '5': sum(path[-1] == '5' for path in paths),
+        '6': sum(path[-1] == '6' for path in paths),
+    }
+
+
+def test_count_paths_components_in_a_row__states_forget_left_cycles():
+    # Arrange
+    G = nx.DiGraph()
+    G.add_edges_from([('s', 'h0'), ('h11', 'e')])
+    for i in range(12):
+        # each component can be left without a cycle, around a, around b, or around both in either order
+        G.add_edges_from([(f'h{i}', f'a{i}'), (f'a{i}', f'h{i}'), (f'h{i}', f'b{i}'), (f'b{i}', f'h{i}')])
+        if i:
+            G.add_edge(f'h{i - 1}', f'h{i}')
+    cycles = find_cycles(G)
+
+    # Act
+    counts = count_paths_with_cycles(G, 's', ['e'], cycles)
+
+    # Assert
+    assert counts == {'e': 5 ** 12}
+    # the states multiply along the row unless they forget the components a path left
+    order, _ = PathStates(G, 's', ['e'], cycles).state_graph()
+    assert len(order) < 10_000
+
+
+def test_count_paths_missing_cycle__raise_exception():
+    # Arrange
+    G = nx.DiGraph()
+    G.add_edges_from([('A', 'B'), ('B', 'C'), ('C', 'B'), ('B', 'D')])
+
+    # Act
+    with pytest.raises(ValueError) as e:
+        count_paths_with_cycles(G, 'A', ['D'], [])
+
+    # Assert
+    assert str(e.value).startswith("Infinite number of paths")
+
+
+def _two_cycles_graph():
+    G = nx.DiGraph()
+    G.add_edges_from([('0', '4'), ('4', '3'), ('3', '1'), ('1', '3'), ('3', '4'), ('4', '5')])
+    return G
+
+
+def test_budget_max_paths__return_first_paths_and_truncated_status():
+    # Arrange
+    G = _two_cycles_graph()
+    cycles = find_cycles(G)
+    stats = PathSearchStats()
+
+    # Act
+    paths = find_paths_with_cycles(G, '0', ['5'], cycles, stats=stats, budget=PathSearchBudget(max_paths=2))
+
+    # Assert
+    assert paths == find_paths_with_cycles(G, '0', ['5'], cycles)[:2]
+    assert stats.truncated == MAX_PATHS
+
+
+def test_budget_max_paths_not_reached__complete_status():
+    # Arrange
+    G = _two_cycles_graph()
+    stats = PathSearchStats()
+
+    # Act
+    paths = find_paths_with_cycles(G, '0', ['5'], find_cycles(G), stats=stats, budget=PathSearchBudget(max_paths=5))
+
+    # Assert
+    assert len(paths) == 5
+    assert stats.truncated is None
+
+
+def test_budget_max_path_length__skip_longer_paths():
+    # Arrange
+    G = _two_cycles_graph()
+    stats = PathSearchStats()
+
+    # Act
+    paths = find_paths_with_cycles(
+        G, '0', ['5'], find_cycles(G), stats=stats, budget=PathSearchBudget(max_path_length=5)
+    )
+
+    # Assert
+    assert paths == [['0', '4', '5'], ['0', '4', '3', '4', '5']]
+    assert stats.truncated == MAX_PATH_LENGTH
+
+
+def test_budget_max_expanded__stop_after_expanding_nodes():
+    # Arrange
+    G = _two_cycles_graph()
+    stats = PathSearchStats()
+
+    # Act
+    paths = find_paths_with_cycles(G, '0', ['5'], find_cycles(G), stats=stats, budget=PathSearchBudget(max_expanded=2))
+
+    # Assert
+    assert paths == [['0', '4', '5']]
+    assert stats.expanded == 2
+    assert stats.truncated == MAX_EXPANDED
+
+
+def test_budget_timeout__stop_when_deadline_passed(mocker):
+    # Arrange
+    G = _two_cycles_graph()
+    stats = PathSearchStats()
+    mocker.patch("src.graph.find_path_with_cycles.time.monotonic", side_effect=[0.0, 0.5, 2.0])
+
+    # Act
+    paths = find_paths_with_cycles(G, '0', ['5'], find_cycles(G), stats=stats, budget=PathSearchBudget(timeout=1.0))
+
+    # Assert
+    assert paths == []
+    assert stats.expanded == 1
+    assert stats.truncated == TIMEOUT
+
+
+def test_parallel_paths_two_cycles_two_ends__same_paths_in_same_order():
+    # Arrange
+    G = nx.DiGraph()
+    G.add_edges_from([
+        ('0', '4'), ('4', '3'), ('3', '1'), ('1', '3'), ('3', '4'), ('4', '5'), ('1', '6'),
+    ])
+    cycles = find_cycles(G)
+    stats = PathSearchStats()
+
+    # Act
+    paths = find_paths_with_cycles_parallel(G, '0', ['5', '6'], cycles, max_workers=2, stats=stats, chunk_expanded=2)
+
+    # Assert
+    assert paths == find_paths_with_cycles(G, '0', ['5', '6'], cycles)
+    assert stats.duplicates == 0
+
+
+def test_parallel_paths_unordered__same_paths():
+    # Arrange
+    G = _two_cycles_graph()
+    cycles = find_cycles(G)
+
+    # Act
+    paths = find_paths_with_cycles_parallel(G, '0', ['5'], cycles, max_workers=2, ordered=False, chunk_expanded=1)
+
+    # Assert
+    assert sorted(paths) == sorted(find_paths_with_cycles(G, '0', ['5'], cycles))
+
+
+def test_graph_long_chain_with_cycle__return_full_paths():
+    # Arrange
+    G = nx.DiGraph()
+    nx.add_path(G, [str(i) for i in range(3000)])
+    G.add_edge('1500', '1000')
+
+    # Act
+    paths = find_paths_with_cycles(G, '0', ['2999'], find_cycles(G))
+
+    # Assert
+    assert [len(path) for path in paths] == [3501, 3000]
+    assert paths[0][1499:1503] == ['1499', '1500', '1000', '1001']
+
+
+def test_graph_dead_end_subflow__prune_branch():
+    # Arrange
+    G = nx.DiGraph()
+    G.add_edges_from([('A', 'B'), ('B', 'C'), ('B', 'X'), ('X', 'Y'), ('Y', 'X'), ('Y', 'Z')])
+    stats = PathSearchStats()
+
+    # Act
+    paths = find_paths_with_cycles(G, 'A', ['C'], find_cycles(G), stats=stats)
+
+    # Assert
+    assert paths == [['A', 'B', 'C']]
+    assert stats.pruned == 1
+    assert stats.expanded == 2
+    assert count_paths_with_cycles(G, 'A', ['C'], []) == {'C': 1}
+
+
+def test_compress_chains_loop_with_action_boxes__collapse_chains():
+    # Arrange
+    G = nx.DiGraph()
+    G.add_edges_from([
+        ('S', 'a1'), ('a1', 'a2'), ('a2', 'D'), ('D', 'b1'), ('b1', 'b2'), ('b2', 'D'), ('D', 'c1'), ('c1', 'E'),
+    ])
+
+    # Act
+    reduced, chains = compress_chains(G, 'S', ['E'])
+
+    # Assert
+    assert reduced.ids == ['S', 'D', 'b1', 'c1', 'E']
+    assert chains == {'S': ['S', 'a1', 'a2'], 'D': ['D'], 'b1': ['b1', 'b2'], 'c1': ['c1'], 'E': ['E']}
+    assert [(reduced.ids[u], reduced.ids[v]) for u, v, _ in reduced.edges()] == [
+        ('S', 'D'), ('D', 'b1'), ('D', 'c1'), ('b1', 'D'), ('c1', 'E'),
+    ]
+
+
+def test_compress_chains_loop_with_action_boxes__same_paths_once_expanded():
+    # Arrange
+    G = nx.DiGraph()
+    G.add_edges_from([
+        ('S', 'a1'), ('a1', 'a2'), ('a2', 'D'), ('D', 'b1'), ('b1', 'b2'), ('b2', 'D'), ('D', 'c1'), ('c1', 'E'),
+    ])
+    reduced, chains = compress_chains(G, 'S', ['E'])
+    reduced_cycles = find_cycles(reduced)
+
+    # Act
+    paths = [expand_path(path, chains) for path in find_paths_with_cycles(reduced, 'S', ['E'], reduced_cycles)]
+
+    # Assert
+    assert [expand_path(cycle, chains) for cycle in reduced_cycles] == [['D', 'b1', 'b2']]
+    assert paths == find_paths_with_cycles(G, 'S', ['E'], find_cycles(G))
+
+
+def _two_components_graph():
+    G = nx.DiGraph()
+    G.add_edges_from([
+        ('A', 'B'), ('B', 'C'), ('C', 'B'), ('C', 'D'), ('D', 'E'), ('E', 'E'), ('E', 'F'), ('F', 'G'),
+    ])
+    return G
+
+
+def test_find_cycles_two_components__skip_trivial_components_and_time_others():
+    # Arrange
+    G = _two_components_graph()
+    scc_timings = []
+
+    # Act
+    cycles = find_cycles(G, scc_timings=scc_timings)
+
+    # Assert
+    assert [sorted(cycle) for cycle in cycles] == [['B', 'C'], ['E']]
+    assert [(timing.nodes, timing.cycles) for timing in scc_timings] == [(2, 1), (1, 1)]
+
+
+def test_find_cycles_in_pool__same_cycles_as_serial():
+    # Arrange
+    G = _two_components_graph()
+
+    # Act
+    cycles = find_cycles(G, max_workers=2)
+    streamed_cycles = list(iter_cycles(G, max_workers=2))
+
+    # Assert
+    assert cycles == find_cycles(G)
+    assert sorted(streamed_cycles) == sorted(cycles)
+
+
+def test_find_cycles_max_length__skip_long_cycles_and_truncated_status():
+    # Arrange
+    G = nx.DiGraph()
+    G.add_edges_from([('A', 'B'), ('B', 'A'), ('B', 'C'), ('C', 'A'), ('C', 'D')])
+    stats = CycleSearchStats()
+
+    # Act
+    cycles = find_cycles(G, max_length=2, stats=stats)
+
+    # Assert
+    assert [sorted(cycle) for cycle in cycles] == [['A', 'B']]
+    assert stats.truncated == MAX_CYCLE_LENGTH
+
+
+def test_find_cycles_max_cycles__stop_and_truncated_status():
+    # Arrange
+    G = _two_components_graph()
+    stats = CycleSearchStats()
+
+    # Act
+    cycles = find_cycles(G, max_cycles=1, stats=stats)
+
+    # Assert
+    assert [sorted(cycle) for cycle in cycles] == [['B', 'C']]
+    assert stats.truncated == MAX_CYCLES
+
+
+def test_find_cycles_limits_not_reached__complete_status():
+    # Arrange
+    G = _two_components_graph()
+    stats = CycleSearchStats()
+
+    # Act
+    cycles = find_cycles(G, max_length=2, max_cycles=2, stats=stats)
+
+    # Assert
+    assert len(cycles) == 2
+    assert stats.truncated is None
+
+
+def test_analyse_page_truncated_cycles_without_budget__raise_exception(tmp_path):
+    # Arrange
+    G = nx.DiGraph()
+    G.add_edges_from([('S', 'A'), ('A', 'B'), ('B', 'C'), ('C', 'D'), ('D', 'A'), ('A', 'E')])
+    output_path = str(tmp_path / "output.java")
+
+    # Act
+    with pytest.raises(ValueError) as e:
+        analyse_page("page", G, output_path, PathSearchBudget(max_paths=10), max_cycle_length=1)
+    _, nb_paths, _ = analyse_page("page", G, output_path, PathSearchBudget(max_path_length=10), max_cycle_length=1)
+
+    # Assert
+    assert "Cycle set truncated because max_cycle_length was reached" in str(e.value)
+    assert nb_paths == 4
+
+
+def test_analyse_page_prime_path_coverage__skip_cycle_search(tmp_path, mocker):
+    # Arrange
+    G = nx.DiGraph()
+    G.add_edges_from([('S', 'A'), ('A', 'B'), ('B', 'A'), ('B', 'E')])
+    find_cycles_mock = mocker.patch("src.main.find_cycles")
+
+    # Act
+    _, nb_paths, _ = analyse_page("page", G, str(tmp_path / "output.java"), coverage=PRIME_PATH)
+
+    # Assert
+    find_cycles_mock.assert_not_called()
+    assert nb_paths == 2
+
+
+def test_iter_paths_lazy_cycles__same_paths():
+    # Arrange
+    G = _two_cycles_graph()
+
+    # Act
+    paths = list(iter_paths_with_cycles(G, '0', ['5'], iter_cycles(G)))
+
+    # Assert
+    assert paths == find_paths_with_cycles(G, '0', ['5'], find_cycles(G))
+
+
+def test_cycle_index_two_cycles_sharing_node__cycles_per_node_and_edge():
+    # Arrange
+    cycles = [['3', '4'], ['1', '3']]
+
+    # Act
+    index = CycleIndex(cycles)
+
+    # Assert
+    assert index.cycles_through_node('3') == [0, 1]
+    assert index.cycles_through_node('0') == []
+    assert index.cycles_through_edge('3', '4') == [0]
+    assert index.cycles_through_edge('4', '5') == []
+    assert index.successors == [{'3': '4', '4': '3'}, {'1': '3', '3': '1'}]
+    assert index.lengths == [2, 2]
+
+
+def test_find_paths_with_cycle_index__same_paths():
+    # Arrange
+    G = _two_cycles_graph()
+    cycles = find_cycles(G)
+
+    # Act
+    paths = find_paths_with_cycles(G, '0', ['5'], CycleIndex(cycles))
+
+    # Assert
+    assert paths == find_paths_with_cycles(G, '0', ['5'], cycles)
+
+
+def test_find_cycles_johnson_backend__same_cycles_as_networkx():
+    # Arrange
+    G = nx.DiGraph()
+    G.add_edges_from([
+        ('0', '1'), ('1', '2'), ('2', '3'), ('3', '1'), ('3', '4'), ('4', '2'), ('4', '4'), ('2', '5'), ('5', '1'),
+    ])
+
+    # Act
+    cycles = find_cycles(G, backend="johnson")
+
+    # Assert
+    assert sorted(map(sorted, cycles)) == sorted(map(sorted, find_cycles(G, backend="networkx")))
+    assert len(cycles) == len(list(nx.simple_cycles(G)))
+
+
+def test_find_cycles_unknown_backend__raise_exception():
+    # Arrange
+    G = _two_components_graph()
+
+    # Act
+    with pytest.raises(ValueError) as e:
+        find_cycles(G, backend="tarjan")
+
+    # Assert
+    assert str(e.value) == "Unknown cycle search backend 'tarjan', expected 'johnson' or 'networkx'"
+
+
+def _nested_loops_graph():
+    G = nx.DiGraph()
+    G.add_edges_from([('s', 'a'), ('a', 'b'), ('b', 'c'), ('c', 'b'), ('c', 'd'), ('d', 'a'), ('d', 'e')])
+    return G
+
+
+def test_loop_nesting_forest_nested_loops__inner_loop_child_of_outer_loop():
+    # Arrange
+    G = _nested_loops_graph()
+
+    # Act
+    forest = find_loop_nesting_forest(G, 's')
+
+    # Assert
+    assert [loop.header for loop in forest.loops] == ['a', 'b']
+    assert forest.loops[0].nodes == {'a', 'b', 'c', 'd'}
+    assert forest.loops[0].back_edges == [('d', 'a')]
+    assert forest.loops[0].children == [1]
+    assert forest.loops[1].nodes == {'b', 'c'}
+    assert forest.loops[1].parent == 0
+    assert forest.roots == [0]
+    assert forest.loop_of == {'a': 0, 'b': 1, 'c': 1, 'd': 0}
+    assert forest.dominators == {'s': 's', 'a': 's', 'b': 'a', 'c': 'b', 'd': 'c', 'e': 'd'}
+
+
+def test_loop_nesting_forest_loop_entered_twice__flag_irreducible_loop():
+    # Arrange
+    G = nx.DiGraph()
+    G.add_edges_from([('s', 'a'), ('s', 'b'), ('a', 'b'), ('b', 'a'), ('b', 't')])
+
+    # Act
+    forest = find_loop_nesting_forest(G, 's')
+
+    # Assert
+    assert len(forest.loops) == 1
+    assert forest.loops[0].nodes == {'a', 'b'}
+    assert not forest.loops[0].reducible
+
+
+def test_find_paths_with_loop_nesting_forest__each_loop_at_most_once():
+    # Arrange
+    G = _nested_loops_graph()
+    forest = find_loop_nesting_forest(G, 's')
+
+    # Act
+    paths = find_paths_with_cycles(G, 's', ['e'], forest)
+
+    # Assert
+    assert paths == [
+        ['s', 'a', 'b', 'c', 'd', 'e'],
+        ['s', 'a', 'b', 'c', 'd', 'a', 'b', 'c', 'd', 'e'],
+        ['s', 'a', 'b', 'c', 'd', 'a', 'b', 'c', 'b', 'c', 'd', 'e'],
+        ['s', 'a', 'b', 'c', 'b', 'c', 'd', 'e'],
+        ['s', 'a', 'b', 'c', 'b', 'c', 'd', 'a', 'b', 'c', 'd', 'e'],
+    ]
+    assert count_paths_with_cycles(G, 's', ['e'], forest) == {'e': 5}
+
+
+def _greedy_trap_paths():
+    # the greedy cover takes the longest path first and then needs both others
+    return [
+        ['s', 'a', 'b', 'c', 'e'],
+        ['s', 'a', 'b', 'e'],
+        ['s', 'b', 'c', 'e'],
+    ]
+
+
+def test_minimum_path_cover_ilp__fewer_paths_than_greedy():
+    # Arrange
+    paths = _greedy_trap_paths()
+
+    # Act
+    cover = minimum_path_cover_ilp(paths)
+
+    # Assert
+    assert cover.paths == [['s', 'a', 'b', 'e'], ['s', 'b', 'c', 'e']]
+    assert cover.status == OPTIMAL
+    assert cover.gap == 0
+
+
+def test_minimum_path_cover_ilp_no_solver__greedy_cover(mocker):
+    # Arrange
+    paths = _greedy_trap_paths()
+    mocker.patch("src.graph.find_minimal_paths.pulp.listSolvers", return_value=[])
+
+    # Act
+    cover = minimum_path_cover_ilp(paths)
+
+    # Assert
+    assert cover.paths == paths
+    assert cover.status == GREEDY
+    assert cover.gap is None
+
+
+def test_greedy_path_cover_two_diamonds__more_paths_for_edge_pairs():
+    # Arrange
+    paths = [
+        ['s', 'a', 'm', 'c', 'e'],
+        ['s', 'a', 'm', 'd', 'e'],
+        ['s', 'b', 'm', 'c', 'e'],
+        ['s', 'b', 'm', 'd', 'e'],
+    ]
+
+    # Act
+    node_cover = greedy_path_cover(paths, NODE)
+    edge_cover = greedy_path_cover(paths, EDGE)
+    edge_pair_cover = greedy_path_cover(paths, EDGE_PAIR)
+
+    # Assert
+    assert node_cover == [['s', 'a', 'm', 'c', 'e'], ['s', 'b', 'm', 'd', 'e']]
+    assert edge_cover == [['s', 'a', 'm', 'c', 'e'], ['s', 'b', 'm', 'd', 'e']]
+    assert edge_pair_cover == [
+        ['s', 'a', 'm', 'c', 'e'],
+        ['s', 'b', 'm', 'd', 'e'],
+        ['s', 'a', 'm', 'd', 'e'],
+        ['s', 'b', 'm', 'c', 'e'],
+    ]
+
+
+def test_greedy_path_cover_streamed_paths__same_cover_as_list():
+    # Arrange
+    G = _two_cycles_graph()
+    cycles = find_cycles(G)
+
+    # Act
+    streamed = greedy_path_cover(iter_paths_with_cycles(G, '0', ['5'], cycles))
+    listed = greedy_path_cover(find_paths_with_cycles(G, '0', ['5'], cycles))
+
+    # Assert
+    assert streamed == listed
+    assert {edge for path in streamed for edge in zip(path, path[1:])} == set(G.edges)
+
+
+def test_greedy_path_cover_path_covering_a_kept_path__keep_only_the_larger_one(mocker):
+    # Arrange
+    paths = [
+        ['s', 'a', 'e'],
+        ['s', 'a', 'b', 'a', 'e'],
+        ['s', 'a', 'b', 'a', 'e'],
+        ['s', 'c', 'e'],
+    ]
+    spy = mocker.spy(find_minimal_paths, "lazy_greedy_cover")
+
+    # Act
+    cover = greedy_path_cover(paths, EDGE)
+
+    # Assert
+    assert len(spy.call_args.args[0]) == 2
+    assert cover == [['s', 'a', 'b', 'a', 'e'], ['s', 'c', 'e']]
+
+
+def test_greedy_path_cover_unknown_criterion__raise_exception():
+    # Act
+    with pytest.raises(ValueError) as e:
+        greedy_path_cover(_greedy_trap_paths(), 'branch')
+
+    # Assert
+    assert str(e.value) == "Unknown coverage criterion 'branch', expected one of ['node', 'edge', 'edge_pair']"
+
+
+def test_cover_paths_with_cycles__paths_of_search_covering_every_edge():
+    # Arrange
+    G = _two_cycles_graph()
+    cycles = find_cycles(G)
+
+    # Act
+    cover = cover_paths_with_cycles(G, '0', ['5'], cycles)
+
+    # Assert
+    paths = find_paths_with_cycles(G, '0', ['5'], cycles)
+    assert all(path in paths for path in cover)
+    assert {edge for path in cover for edge in zip(path, path[1:])} == set(G.edges)
+    assert len(cover) < len(paths)
+
+
+def test_cover_paths_with_cycles_nested_cycles__as_few_paths_as_ilp_cover():
+    # Arrange
+    G = nx.DiGraph()
+    G.add_edges_from([
+        ('0', '2'), ('2', '1'), ('2', '3'), ('2', '4'), ('1', '3'), ('1', '6'),
+        ('3', '4'), ('3', '5'), ('4', '5'), ('4', '6'), ('5', '3'), ('5', '6'),
+    ])
+    cycles = find_cycles(G)
+    paths = find_paths_with_cycles(G, '0', ['6'], cycles)
+
+    # Act
+    cover = cover_paths_with_cycles(G, '0', ['6'], cycles)
+
+    # Assert
+    ilp_cover = minimum_path_cover_ilp(paths)
+    assert ilp_cover.status == OPTIMAL
+    assert len(paths) == 37
+    assert len(cover) == len(ilp_cover.paths) == 4
+    assert all(path in paths for path in cover)
+    assert {edge for path in cover for edge in zip(path, path[1:])} == set(G.edges)
+
+
+def test_cover_paths_with_cycles_chain_of_diamonds__two_paths_without_enumeration():
+    # Arrange
+    G = nx.DiGraph()
+    for i in range(40):
+        G.add_edges_from([(str(i), f'a{i}'), (str(i), f'b{i}'), (f'a{i}', str(i + 1)), (f'b{i}', str(i + 1))])
+
+    # Act
+    cover = cover_paths_with_cycles(G, '0', ['40'], [])
+
+    # Assert
+    assert count_paths_with_cycles(G, '0', ['40'], []) == {'40': 2 ** 40}
+    assert len(cover) == 2
+    assert {edge for path in cover for edge in zip(path, path[1:])} == set(G.edges)
+
+
+def test_find_covering_paths_chain_of_diamonds_with_loops__two_paths_cover_every_edge():
+    # Arrange
+    G = nx.DiGraph()
+    for i in range(30):
+        G.add_edges_from([(str(i), f'a{i}'), (str(i), f'b{i}'), (f'a{i}', str(i + 1)), (f'b{i}', str(i + 1))])
+        if i % 10 == 0:
+            G.add_edge(f'a{i}', str(i))
+    coverage = CoverageStats()
+
+    # Act
+    paths = find_covering_paths(G, '0', ['30'], find_loop_nesting_forest(G, '0'), EDGE, coverage)
+
+    # Assert
+    assert len(paths) == 2
+    assert {edge for path in paths for edge in zip(path, path[1:])} == set(G.edges)
+    assert coverage == CoverageStats(requirements=len(G.nodes) + len(G.edges), covered=len(G.nodes) + len(G.edges))
+
+
+def test_find_covering_paths_edge_pairs__paths_of_search_adding_coverage():
+    # Arrange
+    G = _two_cycles_graph()
+    cycles = find_cycles(G)
+    coverage = CoverageStats()
+    stats = PathSearchStats()
+
+    # Act
+    paths = find_covering_paths(G, '0', ['5'], cycles, EDGE_PAIR, coverage, stats)
+
+    # Assert
+    all_paths = find_paths_with_cycles(G, '0', ['5'], cycles)
+    requirements = {requirement for path in all_paths for requirement in _requirements(path, EDGE_PAIR)}
+    assert all(path in all_paths for path in paths)
+    assert len(paths) < len(all_paths)
+    assert {requirement for path in paths for requirement in _requirements(path, EDGE_PAIR)} == requirements
+    # ('1', '3', '1') would go around the cycle through 1 and 3 twice, it is not a requirement
+    assert ('1', '3', '1') not in requirements
+    assert coverage == CoverageStats(requirements=len(requirements), covered=len(requirements))
+    # the partial paths going around a cycle twice stall and are left, no search goes through every path
+    assert stats.expanded < sum(len(path) - 1 for path in all_paths)
+
+
+def test_find_covering_paths_many_cycles_through_a_node__expand_fewer_nodes_than_paths():
+    # Arrange
+    G = nx.DiGraph()
+    G.add_edges_from([('s', 'h'), ('h', 'e')])
+    for i in range(6):
+        G.add_edges_from([('h', f'a{i}'), (f'a{i}', 'h')])
+    cycles = find_cycles(G)
+    coverage = CoverageStats()
+    stats = PathSearchStats()
+
+    # Act
+    paths = find_covering_paths(G, 's', ['e'], cycles, EDGE_PAIR, coverage, stats)
+
+    # Assert
+    all_paths = find_paths_with_cycles(G, 's', ['e'], cycles)
+    requirements = {requirement for path in all_paths for requirement in _requirements(path, EDGE_PAIR)}
+    assert {requirement for path in paths for requirement in _requirements(path, EDGE_PAIR)} == requirements
+    assert coverage == CoverageStats(requirements=len(requirements), covered=len(requirements))
+    # the states of the stalled partial paths are remembered, the paths grow with the orders
+    # of the cycles but the states only with their subsets
+    assert len(all_paths) == 1957
+    assert stats.expanded < len(all_paths)
+
+
+def test_find_covering_paths_each_loop_once__one_path_around_both_loops():
+    # Arrange
+    G = _nested_loops_graph()
+    coverage = CoverageStats()
+
+    # Act
+    paths = find_covering_paths(G, 's', ['e'], find_loop_nesting_forest(G, 's'), LOOP, coverage)
+
+    # Assert
+    assert paths == [['s', 'a', 'b', 'c', 'b', 'c', 'd', 'a', 'b', 'c', 'd', 'e']]
+    assert coverage == CoverageStats(requirements=2, covered=2)
+
+
+def test_find_covering_paths_loops_of_acyclic_graph__one_path():
+    # Arrange
+    G = nx.DiGraph()
+    G.add_edges_from([('s', 'a'), ('s', 'b'), ('a', 'e'), ('b', 'e')])
+    coverage = CoverageStats()
+
+    # Act
+    paths = find_covering_paths(G, 's', ['e'], find_cycles(G), LOOP, coverage)
+
+    # Assert
+    assert paths == [['s', 'a', 'e']]
+    assert coverage == CoverageStats(requirements=1, covered=1)
+
+
+def _while_loop_graph():
+    G = nx.DiGraph()
+    G.add_edges_from([('s', 'a'), ('a', 'b'), ('b', 'a'), ('b', 'e')])
+    return G
+
+
+def test_find_prime_paths_while_loop__maximal_path_and_both_rotations_of_cycle():
+    # Arrange
+    G = _while_loop_graph()
+
+    # Act
+    prime_paths = find_prime_paths(G)
+
+    # Assert
+    assert prime_paths == [['s', 'a', 'b', 'e'], ['a', 'b', 'a'], ['b', 'a', 'b']]
+
+
+def test_tour_requirements_prime_paths__every_prime_path_toured():
+    # Arrange
+    G = _while_loop_graph()
+    coverage = CoverageStats()
+
+    # Act
+    paths = tour_requirements(G, 's', ['e'], find_prime_paths(G), coverage)
+
+    # Assert
+    assert paths == [['s', 'a', 'b', 'a', 'b', 'e'], ['s', 'a', 'b', 'e']]
+    assert coverage == CoverageStats(requirements=3, covered=3)
+
+
+def test_tour_requirements_edge_pairs__one_path_around_loop():
+    # Arrange
+    G = _while_loop_graph()
+    coverage = CoverageStats()
+
+    # Act
+    paths = tour_requirements(G, 's', ['e'], find_edge_pairs(G), coverage)
+
+    # Assert
+    assert find_edge_pairs(G) == [['s', 'a', 'b'], ['a', 'b', 'a'], ['a', 'b', 'e'], ['b', 'a', 'b']]
+    assert paths == [['s', 'a', 'b', 'a', 'b', 'e']]
+    assert coverage == CoverageStats(requirements=4, covered=4)
+
+
+def test_tour_requirements_unreachable_requirement__left_uncovered():
+    # Arrange
+    G = _while_loop_graph()
+    G.add_edge('x', 'a')
+    coverage = CoverageStats()
+
+    # Act
+    paths = tour_requirements(G, 's', ['e'], [['x', 'a', 'b'], ['a', 'b', 'e']], coverage)
+
+    # Assert
+    assert paths == [['s', 'a', 'b', 'e']]
+    assert coverage == CoverageStats(requirements=2, covered=1)
@@ -0,0 +1,91 @@
+import os
+
+import networkx as nx
+
+from src.graph.flowchart.cache import cached_parse_drawio, CACHE_SUFFIX, _evict
+from src.graph.flowchart.parse import parse_drawio
+
+
+DRAWIO_MXCELL_USEROBJECT_NO_ISOLATE_NODE = r"xml_testing_files/mxcell_userobject_no_isolate.drawio"
+DRAWIO_MXCELL_NO_USEROBJECT_NO_ISOLATE_NODE = r"xml_testing_files/mxcell_no_userobject_no_isolate.drawio"
+
+
+def test_cache_miss__return_parsed_graph_and_store_it(tmp_path):
+    # Act
+    graph: nx.DiGraph = cached_parse_drawio(DRAWIO_MXCELL_USEROBJECT_NO_ISOLATE_NODE, cache_dir=tmp_path)
+
+    # Assert
+    expected = parse_drawio(DRAWIO_MXCELL_USEROBJECT_NO_ISOLATE_NODE)
+    assert list(graph.nodes(data=True)) == list(expected.nodes(data=True))
+    assert list(graph.edges(data=True)) == list(expected.edges(data=True))
+    assert len(list(tmp_path.glob(f"*{CACHE_SUFFIX}"))) == 1
+
+
+def test_cache_hit__skip_xml_parsing(tmp_path, mocker):
+    # Arrange
+    expected = cached_parse_drawio(DRAWIO_MXCELL_USEROBJECT_NO_ISOLATE_NODE, cache_dir=tmp_path)
+    mock_parse = mocker.patch("src.graph.flowchart.cache.parse_drawio")
+
+    # Act
+    graph: nx.DiGraph = cached_parse_drawio(DRAWIO_MXCELL_USEROBJECT_NO_ISOLATE_NODE, cache_dir=tmp_path)
+
+    # Assert
+    assert mock_parse.call_count == 0
+    assert list(graph.nodes(data=True)) == list(expected.nodes(data=True))
+    assert list(graph.edges(data=True)) == list(expected.edges(data=True))
+
+
+def test_cache_over_max_size__evict_least_recently_used(tmp_path):
+    # Arrange
+    cached_parse_drawio(DRAWIO_MXCELL_USEROBJECT_NO_ISOLATE_NODE, cache_dir=tmp_path)
+    old_file = next(tmp_path.glob(f"*{CACHE_SUFFIX}"))
+    cached_parse_drawio(DRAWIO_MXCELL_NO_USEROBJECT_NO_ISOLATE_NODE, cache_dir=tmp_path)
+    new_file = next(f for f in tmp_path.glob(f"*{CACHE_SUFFIX}") if f != old_file)
+    os.utime(old_file, (0, 0))
+
+    # Act
+    _evict(tmp_path, max_size=new_file.stat().st_size)
+
+    # Assert
+    assert list(tmp_path.glob(f"*{CACHE_SUFFIX}")) == [new_file]
+
+
+def test_cache_write_fails__return_parsed_graph_without_tmp_file(tmp_path, mocker):
+    # Arrange
+    mocker.patch("src.graph.flowchart.cache.os.replace", side_effect=OSError("No space left on device"))
+
+    # Act
+    graph: nx.DiGraph = cached_parse_drawio(DRAWIO_MXCELL_USEROBJECT_NO_ISOLATE_NODE, cache_dir=tmp_path)
+
+    # Assert
+    expected = parse_drawio(DRAWIO_MXCELL_USEROBJECT_NO_ISOLATE_NODE)
+    assert list(graph.nodes(data=True)) == list(expected.nodes(data=True))
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_stale_cached_graph__parse_again(tmp_path, mocker):
+    # Arrange
+    cached_parse_drawio(DRAWIO_MXCELL_USEROBJECT_NO_ISOLATE_NODE, cache_dir=tmp_path)
+    mocker.patch("src.graph.flowchart.cache._load", side_effect=ModuleNotFoundError("No module named 'moved'"))
+
+    # Act
+    graph: nx.DiGraph = cached_parse_drawio(DRAWIO_MXCELL_USEROBJECT_NO_ISOLATE_NODE, cache_dir=tmp_path)
+
+    # Assert
+    expected = parse_drawio(DRAWIO_MXCELL_USEROBJECT_NO_ISOLATE_NODE)
+    assert list(graph.nodes(data=True)) == list(expected.nodes(data=True))
+
+
+def test_cache_over_max_size__evict_stale_tmp_file(tmp_path):
+    # Arrange
+    cached_parse_drawio(DRAWIO_MXCELL_USEROBJECT_NO_ISOLATE_NODE, cache_dir=tmp_path)
+    cache_file = next(tmp_path.glob(f"*{CACHE_SUFFIX}"))
+    tmp_file = tmp_path / f"crashed{CACHE_SUFFIX}.1234.tmp"
+    tmp_file.write_bytes(b"partial")
+    os.utime(tmp_file, (0, 0))
+
+    # Act
+    _evict(tmp_path, max_size=cache_file.stat().st_size)
+
+    # Assert
+    assert list(tmp_path.iterdir()) == [cache_file]
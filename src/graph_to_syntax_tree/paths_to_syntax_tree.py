@@ -1,15 +1,21 @@
-from typing import List, Dict
+from typing import List, Dict, Iterable, Iterator
 
+from src.code_generation.syntax.definition import FunctionTestDefinition
 from src.graph_to_syntax_tree.generate_syntax_tree_skeleton import generate_syntax_tree_skeleton_from_test_name
 from src.graph_to_syntax_tree.merge_syntax_tree import merge_syntax_tree
 from src.graph_to_syntax_tree.path_to_syntax import get_test_name_path_using_node_label
 
+TEST_CLASS_NAME = "class_test"
 
-def paths_to_syntax_tree(paths: List[List[Dict]]):
-    sub_syntax_tree = []
+
+def iter_paths_to_syntax_tree(paths: Iterable[List[Dict]]) -> Iterator[FunctionTestDefinition]:
     for path in paths:
         test_name = get_test_name_path_using_node_label(path)
-        sub_syntax_tree.append(generate_syntax_tree_skeleton_from_test_name(test_name))
+        yield generate_syntax_tree_skeleton_from_test_name(test_name)
+
+
+def paths_to_syntax_tree(paths: Iterable[List[Dict]]):
+    sub_syntax_tree = list(iter_paths_to_syntax_tree(paths))
 
-    class_name = "class_test"
-    return merge_syntax_tree(class_name, sub_syntax_tree)
\ No newline at end of file
+    class_name = TEST_CLASS_NAME
+    return merge_syntax_tree(class_name, sub_syntax_tree)
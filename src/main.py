@@ -1,16 +1,28 @@
+import argparse
 import logging
+import re
 import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
 from typing import List, Dict
 
-from src.code_generation.syntax_tree_to_java_code import syntax_tree_to_java_code
-from src.graph.find_cycles import find_cycles
-from src.graph.find_path_with_cycles import find_paths_with_cycles
+import networkx as nx
+from matplotlib import pyplot as plt
+
+from src.code_generation.syntax_tree_to_java_code import stream_syntax_trees_to_java_code
+from src.graph.compress_chains import compress_chains, expand_path
+from src.graph.csr import CSRGraph
+from src.graph.find_covering_paths import iter_covering_paths, CoverageStats, LOOP
+from src.graph.find_cycles import CycleSearchStats, find_cycles
+from src.graph.find_minimal_paths import EDGE, EDGE_PAIR, NODE
+from src.graph.find_path_with_cycles import iter_paths_with_cycles, PathSearchBudget, PathSearchStats
 from src.graph.find_start_end_node import find_start_end_nodes
+from src.graph.loop_nesting_forest import find_loop_nesting_forest
+from src.graph.prime_paths import find_prime_paths, tour_requirements, PRIME_PATH
 from src.graph.flowchart.display import InteractiveGraph
 from src.graph.flowchart.highlight import highlight_path_in_drawio
-from src.graph.flowchart.parse import parse_drawio
-from src.graph_to_syntax_tree.paths_to_syntax_tree import paths_to_syntax_tree
+from src.graph.flowchart.cache import cached_parse_drawio_pages
+from src.graph_to_syntax_tree.paths_to_syntax_tree import iter_paths_to_syntax_tree, TEST_CLASS_NAME
 
 logger = logging.getLogger(__name__)
 
@@ -22,77 +34,210 @@ EXAMPLE_FOLDER = "drawio_examples"
 EXAMPLE_NAME = 'addDemo'
 XML_FILE = Path.cwd().parent / EXAMPLE_FOLDER / f"{EXAMPLE_NAME}.drawio"
 
+_PAGE_FILE_NAME = re.compile(r"[^\w-]+")
+
 
-def highlight():
-    if paths:
+def highlight(page: str, paths: List[List[str]]):
+    if paths and paths[0]:
         first_path = paths[0]  # Select the first path
-        highlight_path_in_drawio(str(XML_FILE), [first_path])
-
-def _formate_paths(paths, graph) -> List[List[Dict]]:
-    formatted_paths = []
-    for path in paths:
-        formatted_path = [
-            {
-                "id": node,
-                "label": graph.nodes[node].get("label", ""),
-                "type": graph.nodes[node].get("type")
-            } for node in path
-        ]
-        formatted_paths.append(formatted_path)
-    return formatted_paths
+        highlight_path_in_drawio(str(XML_FILE), [first_path], page=page)
+
+def _formate_path(path, graph) -> List[Dict]:
+    return [
+        {
+            "id": node,
+            "label": graph.nodes[node].get("label", ""),
+            "type": graph.nodes[node].get("type")
+        } for node in path
+    ]
+
+
+def analyse_page(
+        page: str,
+        graph: nx.DiGraph,
+        output_path: str,
+        budget: PathSearchBudget | None = None,
+        max_cycle_length: int | None = None,
+        max_cycles: int | None = None,
+        natural_loops: bool = False,
+        coverage: str | None = None,
+):
+    """
+    Run the cycles -> paths -> syntax tree -> Java code pipeline on the graph of one page.
+
+    Paths are streamed from the search down to the Java file, none of the stages holds
+    every path at once. With a budget, the path search stops when a limit is hit and the
+    Java code holds the paths found until then. The cycle search can be limited as well, a
+    path search on a truncated cycle set may never end so it needs a max_path_length,
+    max_expanded or timeout budget. With natural_loops, no cycle is enumerated: each path
+    goes around each loop of the loop nesting forest at most once. With a coverage
+    criterion, only the paths adding coverage are kept and the search stops once the
+    criterion is met. PRIME_PATH tours the prime paths without searching cycles or loops.
+
+    Returns:
+        The page name, its number of paths and its first path, or None for both when the
+        page is not a single flowchart (no start or end node).
+
+    Raises:
+        ValueError: If the cycle set is truncated and the budget does not bound the path search
+    """
+    # the algorithms run on the integer indexed form of the graph
+    csr_graph = CSRGraph.from_networkx(graph)
 
+    # find start and ends nodes
+    logger.info(f"[{page}] Finding start and end nodes")
+    try:
+        start_node, end_nodes = find_start_end_nodes(csr_graph)
+    except ValueError as e:
+        logger.warning(f"[{page}] Skipping page: {e}")
+        return page, None, None
+    logger.info(f"[{page}] Start node: {start_node}, End nodes: {end_nodes}")
+
+    # cycles and paths are searched on the graph with its linear chains collapsed
+    reduced_graph, chains = compress_chains(csr_graph, start_node, end_nodes)
+    logger.info(
+        f"[{page}] Chains collapsed: {reduced_graph.number_of_nodes()} nodes "
+        f"out of {csr_graph.number_of_nodes()}"
+    )
+
+    if coverage == PRIME_PATH:
+        # prime paths are toured by shortest paths, they do not follow the cycle rules
+        cycles = None
+    elif natural_loops:
+        # find the loops and how they nest
+        logger.info(f"[{page}] Finding loops")
+        start = time.time()
+        cycles = find_loop_nesting_forest(reduced_graph, start_node)
+        end = time.time()
+        logger.info(f"[{page}] Number of loops: {len(cycles.loops)}")
+        logger.info(f"[{page}] Time taken to find loops: {end - start} seconds")
+    else:
+        # find cycles lists
+        logger.info(f"[{page}] Finding cycles")
+        start = time.time()
+        cycle_stats = CycleSearchStats()
+        cycles = find_cycles(reduced_graph, max_length=max_cycle_length, max_cycles=max_cycles, stats=cycle_stats)
+        end = time.time()
+        logger.info(f"[{page}] Number of cycles: {len(cycles)}")
+        if cycle_stats.truncated:
+            logger.warning(f"[{page}] Cycle set truncated because {cycle_stats.truncated} was reached")
+            if budget is None or (budget.max_path_length is None and budget.max_expanded is None
+                                  and budget.timeout is None):
+                # a path can go around a cycle missing from the set indefinitely
+                raise ValueError(
+                    f"[{page}] Cycle set truncated because {cycle_stats.truncated} was reached, the path "
+                    f"search may never end: give it a max_path_length, max_expanded or timeout budget"
+                )
+        else:
+            logger.info(f"[{page}] Cycle set complete")
+        logger.info(f"[{page}] Time taken to find cycles: {end - start} seconds")
+
+    # find all paths, format and display them as they are found
+    first_path = None
+
+    def formatted_paths():
+        nonlocal first_path
+        if coverage is None:
+            paths = iter_paths_with_cycles(reduced_graph, start_node, end_nodes, cycles, stats=stats, budget=budget)
+        elif coverage == PRIME_PATH:
+            # test paths touring the prime paths
+            paths = tour_requirements(
+                reduced_graph, start_node, end_nodes, find_prime_paths(reduced_graph), coverage_stats
+            )
+        else:
+            paths = iter_covering_paths(
+                reduced_graph, start_node, end_nodes, cycles, coverage, coverage_stats, stats, budget
+            )
+        for path in paths:
+            path = expand_path(path, chains)
+            if first_path is None:
+                first_path = path
+            formatted_path = _formate_path(path, graph)
+            logger.info(f"[{page}] {formatted_path}")
+            yield formatted_path
+
+    # convert each path to a test method of the Java code
+    logger.info(f"[{page}] Finding all paths and converting them to Java code")
+    start = time.time()
+    stats = PathSearchStats()
+    coverage_stats = CoverageStats()
+    nb_paths = stream_syntax_trees_to_java_code(
+        TEST_CLASS_NAME, iter_paths_to_syntax_tree(formatted_paths()), output_path
+    )
+    end = time.time()
+    logger.info(f"[{page}] Number of paths from {start_node} to {end_nodes}: {nb_paths}")
+    if coverage is not None:
+        # requirements of the graph with its chains collapsed, covering them covers the graph
+        logger.info(
+            f"[{page}] {coverage} coverage: {coverage_stats.covered} of {coverage_stats.requirements} "
+            f"requirements covered"
+        )
+    if stats.truncated:
+        logger.warning(f"[{page}] Path search truncated because {stats.truncated} was reached")
+    logger.info(f"[{page}] Time taken to find paths and convert them to Java code: {end - start} seconds")
+    logger.info(f"[{page}] Java code generated successfully")
+    return page, nb_paths, first_path
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Generate Java tests from the paths of a draw.io flowchart")
+    parser.add_argument("--max-paths", type=int, help="stop after this many paths per page")
+    parser.add_argument(
+        "--max-path-length", type=int,
+        help="skip paths with more nodes than this, a collapsed chain counts as one node",
+    )
+    parser.add_argument("--max-expanded", type=int, help="stop after expanding this many nodes per page")
+    parser.add_argument("--timeout", type=float, help="stop the path search of a page after this many seconds")
+    parser.add_argument(
+        "--max-cycle-length", type=int,
+        help="skip cycles with more nodes than this, a collapsed chain counts as one node",
+    )
+    parser.add_argument("--max-cycles", type=int, help="stop the cycle search of a page after this many cycles")
+    parser.add_argument(
+        "--natural-loops", action="store_true",
+        help="go around each loop of the loop nesting forest at most once instead of enumerating cycles",
+    )
+    parser.add_argument(
+        "--coverage", choices=[NODE, EDGE, EDGE_PAIR, LOOP, PRIME_PATH],
+        help="only generate paths adding to this coverage and stop once it is reached",
+    )
+    parser.add_argument("--display", action="store_true", help="display the graph of the first page before the analysis")
+    return parser.parse_args()
 
 
 if __name__ == "__main__":
-    # create networkx graph
-    logger.info("Creating networkx graph")
-    graph = parse_drawio(XML_FILE)
-    logger.info(f"Graph created with {len(graph.nodes)} nodes and {len(graph.edges)} edges")
+    args = _parse_args()
+    budget = PathSearchBudget(args.max_paths, args.max_path_length, args.max_expanded, args.timeout)
+
+    # create one networkx graph per page
+    logger.info("Creating networkx graphs")
+    timings = {}
+    pages = cached_parse_drawio_pages(XML_FILE, timings=timings)
+    if timings:
+        logger.info(f"Time taken to decode compressed pages: {timings.get('decode', 0.0)} seconds")
+        logger.info(f"Time taken to parse pages: {timings['parse']} seconds")
+    else:
+        logger.info("Graphs loaded from cache")
+    for page, graph in pages.items():
+        logger.info(f"[{page}] Graph created with {len(graph.nodes)} nodes and {len(graph.edges)} edges")
 
     # display graph
-    interactive_graph = InteractiveGraph(graph)
-    #plt.show()
-
-    # find start and ends nodes
-    logger.info("Finding start and end nodes")
-    start_node, end_nodes = find_start_end_nodes(graph)
-    #end_nodes = [end_nodes[0]]
-    logger.info(f"Start node: {start_node}, End nodes: {end_nodes}")
-
-    # find cycles lists
-    logger.info("Finding cycles")
-    start = time.time()
-    cycles = find_cycles(graph)
-    end = time.time()
-    logger.info(f"Number of cycles: {len(cycles)}")
-    logger.info(f"Time taken to find cycles: {end - start} seconds")
-
-    # find all paths
-    logger.info("Finding all paths" if cycles else "No cycles found")  # If no cycles, no paths to find)
-    start = time.time()
-    paths = find_paths_with_cycles(graph, start_node, end_nodes, cycles)
-    end = time.time()
-    logger.info(f"Number of paths from {start_node} to {end_nodes}: {len(paths)}")
-    logger.info(f"Time taken to find paths: {end - start} seconds")
-
-    # format and display paths
-    formatted_paths = _formate_paths(paths, graph)
-    logger.info("Paths:")
-    for path in formatted_paths:
-        logger.info(path)
-
-    # get merged syntax tree
-    logger.info("Merging syntax tree")
-    merged_syntax_tree = paths_to_syntax_tree(formatted_paths)
-    logger.info("Syntax tree merged successfully")
-
-    # convert syntax tree to Java code
-    logger.info("Converting merged syntax tree to Java code")
-    start = time.time()
-    syntax_tree_to_java_code(merged_syntax_tree)
-    end = time.time()
-    logger.info(f"Time taken to convert syntax tree to Java code: {end - start} seconds")
-    logger.info("Java code generated successfully")
+    if args.display:
+        interactive_graph = InteractiveGraph(next(iter(pages.values())))
+        plt.show()
+
+    # run the pipeline of every page in parallel
+    with ProcessPoolExecutor() as executor:
+        futures = [
+            executor.submit(
+                analyse_page, page, graph,
+                "output.java" if len(pages) == 1 else f"output_{_PAGE_FILE_NAME.sub('_', page)}.java",
+                budget, args.max_cycle_length, args.max_cycles, args.natural_loops, args.coverage,
+            )
+            for page, graph in pages.items()
+        ]
+        for future in as_completed(futures):
+            page, nb_paths, first_path = future.result()
 
-    # highlight the first path
-    #highlight()
+            # highlight the first path
+            #highlight(page, [first_path])